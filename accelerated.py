@@ -0,0 +1,172 @@
+"""Accelerated CPU backends for the manifestoberta classifier.
+
+Two variants of the engine in engine.py are available:
+
+- ``torch-int8``: the eager model with its Linear layers dynamically
+  quantized to int8.
+- ``onnx`` / ``onnx-int8``: the model exported once to ONNX (optionally with
+  int8 weights) under the cache directory and run with ONNX Runtime.
+
+Select one process-wide with the POLCOMPASS_ENGINE environment variable or
+pass ``load_engine(mode)`` to Segmenter(engine=...). Running this module
+reports how far a variant drifts from the fp32 model on the sentences in
+test.py:
+
+    python accelerated.py --mode onnx-int8
+"""
+import argparse
+import copy
+import os
+import time
+
+import numpy as np
+import torch
+
+from embedding_cache import default_cache_dir
+from engine import InferenceEngine
+from projection import build_projection_matrix
+from registry import CLASSIFIER_NAME, resources, tokenizer_lock
+
+MODES = ("torch", "torch-int8", "onnx", "onnx-int8")
+
+
+class _LogitsOnly(torch.nn.Module):
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask).logits
+
+
+def onnx_paths(cache_dir=None):
+    model_dir = os.path.join(cache_dir or default_cache_dir(), "onnx", CLASSIFIER_NAME.replace("/", "--"))
+    return os.path.join(model_dir, "model.onnx"), os.path.join(model_dir, "model.int8.onnx")
+
+
+def export_onnx(model, tokenizer, path):
+    """Export the classifier to ONNX with dynamic batch and sequence axes."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    sample = tokenizer("A sentence.", "Its context.", return_tensors="pt")
+    torch.onnx.export(
+        _LogitsOnly(model.eval()),
+        (sample["input_ids"], sample["attention_mask"]),
+        path,
+        input_names=["input_ids", "attention_mask"],
+        output_names=["logits"],
+        dynamic_axes={
+            "input_ids": {0: "batch", 1: "sequence"},
+            "attention_mask": {0: "batch", 1: "sequence"},
+            "logits": {0: "batch"},
+        },
+        opset_version=14,
+    )
+
+
+def quantize_onnx(source, target):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    quantize_dynamic(source, target, weight_type=QuantType.QInt8, use_external_data_format=True)
+
+
+class OnnxEngine(InferenceEngine):
+    """InferenceEngine that runs an exported ONNX graph with ONNX Runtime."""
+
+    def __init__(self, path, tokenizer, id2label, batch_size=16, max_length=300, num_threads=None):
+        import onnxruntime
+        options = onnxruntime.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.name = path
+        self.tokenizer = tokenizer
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.id2label = id2label
+        self.projection = build_projection_matrix(self.id2label)
+
+    def _forward(self, features):
+        with tokenizer_lock(self.tokenizer):
+            batch = self.tokenizer.pad(features, return_tensors="np")
+        (logits,) = self.session.run(
+            ["logits"],
+            {
+                "input_ids": batch["input_ids"].astype(np.int64),
+                "attention_mask": batch["attention_mask"].astype(np.int64),
+            },
+        )
+        logits = logits - logits.max(axis=1, keepdims=True)
+        exp = np.exp(logits)
+        return (exp / exp.sum(axis=1, keepdims=True)).astype(np.float32)
+
+
+def load_engine(mode="torch", cache_dir=None):
+    """Build the engine for mode, exporting or quantizing the ONNX artifact on first use."""
+    if mode not in MODES:
+        raise ValueError(f"Unknown engine mode {mode!r}; expected one of {', '.join(MODES)}")
+    tokenizer = resources.get("tokenizer")
+    if mode == "torch":
+        return InferenceEngine(resources.get("classifier"), tokenizer)
+    if mode == "torch-int8":
+        quantized = torch.ao.quantization.quantize_dynamic(
+            copy.deepcopy(resources.get("classifier")), {torch.nn.Linear}, dtype=torch.qint8
+        )
+        engine = InferenceEngine(quantized, tokenizer)
+        engine.name = f"{CLASSIFIER_NAME}:{mode}"
+        return engine
+
+    fp32_path, int8_path = onnx_paths(cache_dir)
+    if not os.path.exists(fp32_path):
+        export_onnx(resources.get("classifier"), tokenizer, fp32_path)
+    path = fp32_path
+    if mode == "onnx-int8":
+        if not os.path.exists(int8_path):
+            quantize_onnx(fp32_path, int8_path)
+        path = int8_path
+    engine = OnnxEngine(path, tokenizer, resources.get("config").id2label)
+    engine.name = f"{CLASSIFIER_NAME}:{mode}"
+    return engine
+
+
+def compare_engines(reference, candidate, pairs, top_k=3):
+    """Report top-k agreement, econ/social drift and speed of candidate against reference."""
+    start = time.perf_counter()
+    reference_probs = reference.probabilities(pairs)
+    reference_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    candidate_probs = candidate.probabilities(pairs)
+    candidate_seconds = time.perf_counter() - start
+
+    reference_top = np.argsort(-reference_probs, axis=1, kind="stable")[:, :top_k]
+    candidate_top = np.argsort(-candidate_probs, axis=1, kind="stable")[:, :top_k]
+    drift = np.abs(reference.project(reference_probs, top_k=top_k) - candidate.project(candidate_probs, top_k=top_k))
+    return {
+        "sentences": len(pairs),
+        "top1_agreement": float(np.mean(reference_top[:, 0] == candidate_top[:, 0])),
+        "topk_set_agreement": float(np.mean([
+            set(a) == set(b) for a, b in zip(reference_top.tolist(), candidate_top.tolist())
+        ])),
+        "max_prob_drift": float(np.abs(reference_probs - candidate_probs).max()),
+        "mean_econ_drift": float(drift[:, 0].mean()),
+        "max_econ_drift": float(drift[:, 0].max()),
+        "mean_social_drift": float(drift[:, 1].mean()),
+        "max_social_drift": float(drift[:, 1].max()),
+        "speedup": reference_seconds / candidate_seconds if candidate_seconds else float("inf"),
+    }
+
+
+def main():
+    from test import political_sentences, political_sentences_m
+
+    parser = argparse.ArgumentParser(description="Check an accelerated engine against the fp32 model.")
+    parser.add_argument("--mode", choices=MODES[1:], default="onnx-int8")
+    parser.add_argument("--top-k", type=int, default=3)
+    args = parser.parse_args()
+
+    pairs = [(sentence, "") for sentence in political_sentences + political_sentences_m]
+    report = compare_engines(load_engine("torch"), load_engine(args.mode), pairs, top_k=args.top_k)
+    for key, value in report.items():
+        print(f"{key}: {value:.4f}" if isinstance(value, float) else f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,63 +1,38 @@
 import streamlit as st
 import asyncio
-from segmenter import Segmenter  
-import matplotlib.pyplot as plt
-import numpy as np
-
-async def process_text(corpus):
-    segmenter = Segmenter(corpus)
-    await segmenter.initialize()
-    return segmenter
-
-def plot_embedding(segmenter):
-    median = segmenter._embed_corpus()
-    points = segmenter.points
-
-    plt.figure(figsize=(10, 10))
-    plt.style.use('ggplot')
-    quadrant_colors = {
-        'top_left': '#FFB3BA',      # Soft Pink (Liberal)
-        'top_right': '#BAFFC9',     # Soft Green (Libertarian)
-        'bottom_left': '#BAE1FF',   # Soft Blue (Socialist)
-        'bottom_right': '#FFE9BA'   # Soft Yellow (Conservative)
-    }
-
-    # Fill quadrants with colors
-    plt.axhline(y=0, color='gray', linestyle='--', linewidth=0.5)
-    plt.axvline(x=0, color='gray', linestyle='--', linewidth=0.5)
-
-    plt.fill_between([-10, 0], 0, 10, color=quadrant_colors['top_left'], alpha=0.3)
-    plt.fill_between([0, 10], 0, 10, color=quadrant_colors['top_right'], alpha=0.3)
-    plt.fill_between([-10, 0], -10, 0, color=quadrant_colors['bottom_left'], alpha=0.3)
-    plt.fill_between([0, 10], -10, 0, color=quadrant_colors['bottom_right'], alpha=0.3)
-
-    # Add labels to quadrants
-    plt.text(-5, 9, 'AuthLeft', horizontalalignment='center', fontsize=10)
-    plt.text(5, 9, 'AuthRight', horizontalalignment='center', fontsize=10)
-    plt.text(-5, -1, 'LibLeft', horizontalalignment='center', fontsize=10)
-    plt.text(5, -1, 'LibRight', horizontalalignment='center', fontsize=10)
-
-    # Plot individual points
-    econ_points = [point[0] for point in points]
-    social_points = [point[1] for point in points]
-    plt.scatter(econ_points, social_points, c='blue', alpha=0.6, edgecolors='black', linewidth=0.5)
-
-    # Plot geometric median
-    if median is not None:
-        mx, my = median
-        plt.scatter(mx, my, c='red', s=200, marker='*', edgecolors='black', linewidth=1, label='Corpus Median')
-
-    plt.title('Political Ideology Embedding', fontsize=15)
-    plt.xlabel('Economic Axis (Left ← → Right)', fontsize=12)
-    plt.ylabel('Social Axis (Liberal ↑ → Conservative ↓)', fontsize=12)
-    plt.xlim(-10, 10)
-    plt.ylim(-10, 10)
-    plt.grid(True, linestyle='--', linewidth=0.5)
-    plt.legend()
-    plt.tight_layout()
-
-    # Return the figure to render in Streamlit
-    return plt.gcf()
+from segmenter import EMBEDDING_MODEL, Segmenter
+from embedding_cache import EmbeddingCache
+from registry import resources
+from telemetry import telemetry
+from compass import get_renderer
+
+@st.cache_resource
+def warm_up_models():
+    return resources.warm_up("engine", "spacy:en_core_web_sm")
+
+@st.cache_resource
+def get_embedding_cache():
+    return EmbeddingCache(model=EMBEDDING_MODEL)
+
+async def analyze_text(corpus):
+    """Analyze corpus, reusing the previous run's work for sentences that did not change."""
+    segmenter = st.session_state.get("segmenter")
+    try:
+        if segmenter is None:
+            segmenter = Segmenter(corpus, embedding_cache=get_embedding_cache())
+            await segmenter.initialize()
+            st.session_state.segmenter = segmenter
+            return segmenter.analyze()
+        return await segmenter.update(corpus)
+    except BaseException:
+        # Start the next run from scratch rather than from a failed one.
+        st.session_state.pop("segmenter", None)
+        raise
+
+@st.cache_data(max_entries=64)
+def render_compass(points, median):
+    """PNG of the compass for these points; cached, so reruns with the same result skip drawing."""
+    return get_renderer().render_png(points, median)
 
 # Prefilled text examples with contextual surroundings
 examples = {
@@ -143,6 +118,9 @@ def main():
     st.title("🌎 Political Ideology Analyzer")
     st.write("Analyze the economic and social ideological leanings of your text.")
 
+    with st.spinner("Loading models..."):
+        load_times = warm_up_models()
+
     # Initialize session state for the selected example and custom text
     if "example_choice" not in st.session_state:
         st.session_state.example_choice = ""
@@ -163,6 +141,12 @@ def main():
             st.session_state.example_choice = "Extreme Example"
             st.session_state.custom_text = examples["Extreme Example"]["text"]
 
+        with st.expander("Model load times"):
+            for name, seconds in load_times.items():
+                st.write(f"{name}: {seconds:.1f}s")
+
+        show_timings = st.checkbox("Show timing breakdown")
+
     # Input text box and context display
     example = examples.get(st.session_state.example_choice, {"text": "", "context": ""})
     
@@ -186,11 +170,13 @@ def main():
         if not input_text.strip():
             st.error("Please enter some text for analysis.")
         else:
-            with st.spinner("Processing..."):
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                context = example["context"] if st.session_state.example_choice else ""
-                segmenter = loop.run_until_complete(process_text(input_text + "\n" + context))
+            # The session's Segmenter keeps an async client bound to this loop,
+            # so reuse one loop per session.
+            if "loop" not in st.session_state:
+                st.session_state.loop = asyncio.new_event_loop()
+            loop = st.session_state.loop
+            asyncio.set_event_loop(loop)
+            context = example["context"] if st.session_state.example_choice else ""
             
             # Create two columns for results
             col1, col2 = st.columns([2, 1])
@@ -198,26 +184,25 @@ def main():
             with col1:
                 # Display economic and social scores for each sentence
                 st.subheader("📊 Sentence-Level Ideology Analysis")
-                scores = []
-                for i, data in enumerate(segmenter.context):
-                    sentence = data["sentence"]
-                    econ_score, social_score, probs = Segmenter._embed(
-                        sentence=sentence,
-                        context=data["similarity_context"],
-                    )
-                    scores.append((sentence, econ_score, social_score))
+                with st.spinner("Processing..."), telemetry.collect() as timings:
+                    analysis = loop.run_until_complete(analyze_text(input_text + "\n" + context))
+                if show_timings:
+                    with st.expander("Timing breakdown", expanded=True):
+                        for stage, seconds in timings.totals().items():
+                            st.write(f"{stage}: {seconds * 1000:.0f} ms")
+                        for counter, value in sorted(timings.counters.items()):
+                            st.write(f"{counter}: {value:g}")
+                for sentence, econ_score, social_score, probs in analysis:
                     create_sentence_summary_card(sentence, econ_score, social_score, probs)
 
             with col2:
                 # Display overall ideological embedding visualization
                 st.subheader("🗺️ Corpus Embedding")
-                fig = plot_embedding(segmenter)
-                st.pyplot(fig)
+                st.image(render_compass(analysis.points, analysis.median), use_container_width=True)
 
                 # Calculate and display overall corpus ideology
-                if scores:
-                    avg_econ = np.mean([s[1] for s in scores])
-                    avg_social = np.mean([s[2] for s in scores])
+                if len(analysis):
+                    avg_econ, avg_social = analysis.points.mean(axis=0)
                     quadrant, description = get_quadrant_description(avg_econ, avg_social)
                     
                     st.markdown(f"""
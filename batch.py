@@ -0,0 +1,279 @@
+"""Score a collection of documents and write per-sentence and per-document results.
+
+Usage:
+    python batch.py speeches/ --output results/
+    python batch.py manifestos.jsonl --output results/ --format parquet
+
+Documents are read from *.txt files in a directory or from a JSONL file with
+one {"id": ..., "text": ..., ...} record per line; any other fields are kept
+as document metadata. Finished groups are recorded in checkpoint.jsonl inside
+the output directory, so rerunning the same command resumes where it stopped.
+"""
+import argparse
+import asyncio
+import json
+import os
+
+import numpy as np
+
+from cascade import CascadeProbe
+from classification_cache import CachedEngine, ClassificationCache
+from embedding_cache import EmbeddingCache
+from pool import InferencePool
+from registry import resources
+from result_store import ResultStore
+from segmentation import STRATEGIES
+from segmenter import Segmenter
+
+
+def iter_documents(path, id_field="id", text_field="text"):
+    """Yield (doc_id, text, metadata) from a directory of .txt files or a JSONL file."""
+    if os.path.isdir(path):
+        for root, _, files in sorted(os.walk(path)):
+            for name in sorted(files):
+                if not name.endswith(".txt"):
+                    continue
+                file_path = os.path.join(root, name)
+                with open(file_path, encoding="utf-8") as f:
+                    yield os.path.relpath(file_path, path), f.read(), {}
+        return
+
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            text = record.pop(text_field)
+            doc_id = str(record.pop(id_field, line_number))
+            yield doc_id, text, record
+
+
+class Checkpoint:
+    """Append-only log of written result parts and the documents they contain.
+
+    When results also go to a ResultStore, each entry records the store's
+    committed counts, so a resumed run can drop documents appended after them.
+    """
+
+    def __init__(self, output_dir):
+        self.path = os.path.join(output_dir, "checkpoint.jsonl")
+        self.parts = {}
+        self.store = None
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        if "part" in entry:
+                            self.parts[entry["part"]] = entry["ids"]
+                        self.store = entry.get("store", self.store)
+        self.done = {doc_id for ids in self.parts.values() for doc_id in ids}
+
+    @property
+    def next_part(self):
+        return max(self.parts, default=-1) + 1
+
+    def _append(self, entry):
+        with open(self.path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def record(self, part, ids, store=None):
+        entry = {"part": part, "ids": ids}
+        if store is not None:
+            entry["store"] = store
+            self.store = store
+        self._append(entry)
+        self.parts[part] = ids
+        self.done.update(ids)
+
+    def record_store(self, store):
+        """Remember the store's counts before this output's first part is added to it."""
+        self._append({"store": store})
+        self.store = store
+
+
+def remove_orphan_parts(parts_dir, checkpoint):
+    """Delete parts written by a run that crashed before checkpointing them."""
+    for name in os.listdir(parts_dir):
+        part = name.split(".", 1)[0]
+        if part.startswith("part-") and int(part[len("part-"):]) not in checkpoint.parts:
+            os.remove(os.path.join(parts_dir, name))
+
+
+def write_rows(rows, path, output_format):
+    tmp_path = path + ".tmp"
+    if output_format == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        pq.write_table(pa.Table.from_pylist(rows), tmp_path)
+    else:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    os.replace(tmp_path, path)
+
+
+async def score_group(documents, embedding_backend, embedding_cache=None, language_model="en_core_web_sm", top_k=3, batch_size=None, engine=None, segmentation="parser", n_process=1, cascade=None):
+    """Score a group of documents with a single cross-document classification pass."""
+    engine = engine or resources.get("cached_engine")
+    segmenters = [
+        Segmenter(
+            text,
+            language_model=language_model,
+            embedding_backend=embedding_backend,
+            embedding_cache=embedding_cache,
+            engine=engine,
+            segmentation=segmentation,
+            n_process=n_process,
+            cascade=cascade,
+        )
+        for _, text, _ in documents
+    ]
+    await asyncio.gather(*(segmenter.initialize() for segmenter in segmenters))
+
+    pairs, encoded = [], []
+    for segmenter in segmenters:
+        segmenter_pairs, segmenter_encoded = segmenter._classification_inputs()
+        pairs.extend(segmenter_pairs)
+        encoded.extend(segmenter_encoded or [])
+    encoded = encoded if len(encoded) == len(pairs) else None
+    if cascade is None:
+        probs = engine.probabilities(pairs, batch_size=batch_size, encoded=encoded)
+    else:
+        embeddings = np.vstack([segmenter.sentence_embeddings for segmenter in segmenters] + [np.zeros((0, cascade.dim))])
+        probs = cascade.probabilities(engine, pairs, embeddings, batch_size=batch_size, encoded=encoded)
+    points = engine.project(probs, top_k=top_k)
+    top_probs = engine.top_k(probs, top_k=top_k)
+
+    sentence_rows, document_rows, doc_point_sets = [], [], []
+    offset = 0
+    for (doc_id, _, metadata), segmenter in zip(documents, segmenters):
+        count = len(segmenter.context)
+        doc_points = points[offset:offset + count]
+        for i in range(count):
+            econ_score, social_score = doc_points[i].tolist()
+            sentence_rows.append({
+                "doc_id": doc_id,
+                "index": i,
+                "sentence": pairs[offset + i][0],
+                "econ": econ_score,
+                "social": social_score,
+                "categories": [cat for cat, _ in top_probs[offset + i]],
+                "probs": [prob for _, prob in top_probs[offset + i]],
+            })
+        document_rows.append({
+            "doc_id": doc_id,
+            "num_sentences": count,
+            "metadata": json.dumps(metadata, ensure_ascii=False),
+        })
+        doc_point_sets.append(doc_points)
+        offset += count
+
+    medians, info = Segmenter.batch_geometric_median(doc_point_sets)
+    for row, median, converged in zip(document_rows, medians.tolist(), info["converged"].tolist()):
+        empty = row["num_sentences"] == 0
+        row["median_econ"] = None if empty else median[0]
+        row["median_social"] = None if empty else median[1]
+        row["median_converged"] = converged
+    return sentence_rows, document_rows
+
+
+async def run(args):
+    parts_dir = os.path.join(args.output, "parts")
+    os.makedirs(parts_dir, exist_ok=True)
+    checkpoint = Checkpoint(args.output)
+    remove_orphan_parts(parts_dir, checkpoint)
+
+    resources.spacy(args.language_model, args.segmentation)
+    if args.workers:
+        pool = InferencePool(num_workers=args.workers, threads_per_worker=args.threads_per_worker)
+        pool.warm_up()
+        engine = CachedEngine(pool, ClassificationCache(path=os.environ.get("POLCOMPASS_CLASSIFICATION_CACHE")))
+    else:
+        engine = resources.get("cached_engine")
+    embedding_backend = Segmenter._resolve_embedding_backend(args.embedding_backend, max_concurrency=args.max_concurrency)
+    embedding_cache = EmbeddingCache(dim=embedding_backend.dim, model=embedding_backend.name) if args.embedding_cache else None
+    store = ResultStore(args.store, top_k=args.top_k) if args.store else None
+    cascade = CascadeProbe.load(args.cascade) if args.cascade else None
+    if store is not None:
+        if checkpoint.store is None:
+            checkpoint.record_store(store.state())
+        else:
+            # Documents appended by a run that crashed before checkpointing them.
+            store.truncate(**checkpoint.store)
+
+    extension = "parquet" if args.format == "parquet" else "jsonl"
+    part = checkpoint.next_part
+    group = []
+
+    async def flush(group, part):
+        sentence_rows, document_rows = await score_group(
+            group,
+            embedding_backend,
+            embedding_cache,
+            language_model=args.language_model,
+            top_k=args.top_k,
+            batch_size=args.batch_size,
+            engine=engine,
+            segmentation=args.segmentation,
+            n_process=args.n_process,
+            cascade=cascade,
+        )
+        write_rows(sentence_rows, os.path.join(parts_dir, f"part-{part:05d}.sentences.{extension}"), args.format)
+        write_rows(document_rows, os.path.join(parts_dir, f"part-{part:05d}.documents.{extension}"), args.format)
+        if store is not None:
+            for doc_id, _, metadata in group:
+                rows = [row for row in sentence_rows if row["doc_id"] == doc_id]
+                store.add_document(
+                    doc_id,
+                    [(row["econ"], row["social"]) for row in rows],
+                    [list(zip(row["categories"], row["probs"])) for row in rows],
+                    [row["sentence"] for row in rows],
+                    metadata,
+                )
+        checkpoint.record(part, [doc_id for doc_id, _, _ in group], None if store is None else store.state())
+        print(f"part {part}: {len(group)} documents, {len(sentence_rows)} sentences")
+
+    for document in iter_documents(args.input, args.id_field, args.text_field):
+        if document[0] in checkpoint.done:
+            continue
+        group.append(document)
+        if len(group) == args.docs_per_part:
+            await flush(group, part)
+            part, group = part + 1, []
+    if group:
+        await flush(group, part)
+    if args.workers:
+        pool.close()
+    print(f"classification cache: {engine.cache.stats()}")
+    if cascade is not None:
+        print(f"cascade: skipped {cascade.skipped} of {cascade.skipped + cascade.classified} sentences ({cascade.skip_rate:.1%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a collection of documents on the political compass.")
+    parser.add_argument("input", help="Directory of .txt files or a JSONL file of documents")
+    parser.add_argument("--output", required=True, help="Directory for result parts and the checkpoint")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl")
+    parser.add_argument("--id-field", default="id")
+    parser.add_argument("--text-field", default="text")
+    parser.add_argument("--docs-per-part", type=int, default=32, help="Documents scored together and written as one part")
+    parser.add_argument("--batch-size", type=int, default=None, help="Classifier batch size")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--language-model", default="en_core_web_sm")
+    parser.add_argument("--segmentation", choices=STRATEGIES, default="parser", help="Sentence segmentation strategy")
+    parser.add_argument("--n-process", type=int, default=1, help="Segment long documents in this many processes")
+    parser.add_argument("--embedding-backend", choices=["openai", "local"], default="openai")
+    parser.add_argument("--embedding-cache", action="store_true", help="Reuse embeddings from the on-disk cache")
+    parser.add_argument("--max-concurrency", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=0, help="Classify in this many worker processes")
+    parser.add_argument("--threads-per-worker", type=int, default=None)
+    parser.add_argument("--cascade", help="Probe from cascade.py; confidently non-political sentences skip the classifier")
+    parser.add_argument("--store", help="Also append results to a columnar ResultStore in this directory")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""Time each stage of the Segmenter pipeline on corpora of increasing size.
+
+Usage:
+    python benchmark.py --save benchmarks/baseline.json
+    python benchmark.py --compare benchmarks/baseline.json
+
+Stages are timed separately: spaCy segmentation, embedding (through the
+batched OpenAI backend against an in-process fake client), similarity
+context, classification, projection and geometric median. Each stage reports
+throughput and p50/p99 latency over --repeats untraced runs, plus peak traced
+memory from one extra run under tracemalloc. Similarity context and
+classification follow Segmenter's default token budget (tokenizing every
+sentence, packing by token length and classifying from token IDs) unless
+--context-budget chars is given.
+Classification runs the real model and is skipped above --max-classify
+sentences; projection and the median use the classifier's output when it ran
+and a random probability matrix otherwise.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+import types
+
+import numpy as np
+
+from constants import category_ideology_mapping
+from embeddings import OpenAIEmbeddingBackend
+from engine import TokenCache
+from neighbors import iter_context_neighbors, join_context, join_ids
+from projection import build_projection_matrix, project
+from registry import resources
+from segmenter import CONTEXT_TOKENS, Segmenter
+
+SIZES = (10, 100, 1000, 10000)
+STAGES = ("segmentation", "embedding", "similarity_context", "classification", "projection", "geometric_median")
+
+WORDS = (
+    "the government will invest in jobs workers taxes market state education health "
+    "security borders trade growth welfare freedom rights industry farmers women youth "
+    "nation energy prices climate corruption reform pensions housing police military"
+).split()
+
+
+class FakeEmbeddingsClient:
+    """Stands in for AsyncOpenAI: deterministic vectors per text after a simulated round-trip."""
+
+    def __init__(self, dim=1536, latency=0.05):
+        self.dim = dim
+        self.latency = latency
+        self.requests = 0
+        self.embeddings = self
+
+    async def create(self, model, input):
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        data = []
+        for index, text in enumerate(input):
+            seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+            vector = np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+            data.append(types.SimpleNamespace(index=index, embedding=vector.tolist()))
+        return types.SimpleNamespace(data=data)
+
+
+def synthetic_corpus(size, seed=0):
+    rng = random.Random(seed)
+    sentences = []
+    for _ in range(size):
+        words = rng.choices(WORDS, k=rng.randint(6, 30))
+        sentences.append(" ".join(words).capitalize() + ".")
+    return sentences
+
+
+def speech_corpus(size):
+    from test import political_sentences, political_sentences_m
+    source = political_sentences + political_sentences_m
+    return [source[i % len(source)] for i in range(size)]
+
+
+def measure(fn, size, repeats):
+    latencies = []
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        latencies.append(time.perf_counter() - start)
+    # Tracing slows Python-heavy stages, so peak memory gets its own run.
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    p50 = float(np.percentile(latencies, 50))
+    return result, {
+        "sentences": size,
+        "p50_s": p50,
+        "p99_s": float(np.percentile(latencies, 99)),
+        "throughput_per_s": size / p50 if p50 else float("inf"),
+        "peak_traced_mb": peak / 2 ** 20,
+    }
+
+
+def run_corpus(sentences, stages, repeats, max_classify, embedding_latency, context_budget="tokens"):
+    size = len(sentences)
+    results = {}
+
+    if "segmentation" in stages:
+        nlp = resources.spacy("en_core_web_sm")
+        text = " ".join(sentences)
+        _, results["segmentation"] = measure(lambda: [sent.text for sent in nlp(text).sents], size, repeats)
+
+    backend = OpenAIEmbeddingBackend(client=FakeEmbeddingsClient(latency=embedding_latency))
+    embed = lambda: asyncio.run(backend.embed(sentences))
+    if "embedding" in stages:
+        embeddings, results["embedding"] = measure(embed, size, repeats)
+    else:
+        embeddings = embed()
+
+    def build_context():
+        # As Segmenter._packing: a fresh token cache, so every run tokenizes the corpus.
+        if context_budget == "chars":
+            lengths, budget, token_ids = None, 300, None
+        else:
+            token_ids = TokenCache(resources.get("tokenizer")).get_many(sentences)
+            lengths, budget = [len(ids) for ids in token_ids], CONTEXT_TOKENS
+        neighbors = [
+            used for _, used, _, _ in iter_context_neighbors(sentences, embeddings, budget=budget, lengths=lengths)
+        ]
+        return neighbors, token_ids
+
+    if "similarity_context" in stages:
+        (neighbors, token_ids), results["similarity_context"] = measure(build_context, size, repeats)
+    else:
+        neighbors, token_ids = build_context()
+
+    probs = None
+    if "classification" in stages and size <= max_classify:
+        engine = resources.get("engine")
+        pairs = [(sentence, join_context(used, sentences)) for sentence, used in zip(sentences, neighbors)]
+        encoded = None
+        if token_ids is not None:
+            encoded = [(ids, join_ids(used, token_ids)) for ids, used in zip(token_ids, neighbors)]
+        probs, results["classification"] = measure(lambda: engine.probabilities(pairs, encoded=encoded), size, repeats)
+    if probs is None:
+        probs = np.random.default_rng(0).dirichlet(np.ones(len(category_ideology_mapping)), size=size)
+        id2label = dict(enumerate(category_ideology_mapping))
+    else:
+        id2label = resources.get("engine").id2label
+
+    matrix = build_projection_matrix(id2label)
+    if "projection" in stages:
+        points, results["projection"] = measure(lambda: project(probs, matrix, top_k=3), size, repeats)
+    else:
+        points = project(probs, matrix, top_k=3)
+
+    if "geometric_median" in stages:
+        _, results["geometric_median"] = measure(lambda: Segmenter.geometric_median(points), size, repeats)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Return regressions where p50 latency grew by more than tolerance over the baseline."""
+    regressions = []
+    for corpus, sizes in results.items():
+        for size, stages in sizes.items():
+            for stage, metrics in stages.items():
+                reference = baseline.get(corpus, {}).get(size, {}).get(stage)
+                if reference and metrics["p50_s"] > reference["p50_s"] * (1 + tolerance):
+                    regressions.append(
+                        f"{corpus}/{size}/{stage}: p50 {metrics['p50_s']:.4f}s vs baseline {reference['p50_s']:.4f}s"
+                    )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Segmenter pipeline stages.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--corpora", nargs="+", choices=["synthetic", "speeches"], default=["synthetic", "speeches"])
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--max-classify", type=int, default=1000, help="Skip classification above this many sentences")
+    parser.add_argument("--embedding-latency", type=float, default=0.05, help="Simulated seconds per embeddings request")
+    parser.add_argument("--context-budget", choices=["tokens", "chars"], default="tokens", help="Budget unit for similarity context")
+    parser.add_argument("--save", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p50 slowdown before flagging a regression")
+    args = parser.parse_args()
+
+    corpora = {"synthetic": synthetic_corpus, "speeches": speech_corpus}
+    results = {}
+    for corpus in args.corpora:
+        results[corpus] = {}
+        for size in args.sizes:
+            stages = run_corpus(
+                corpora[corpus](size), args.stages, args.repeats, args.max_classify, args.embedding_latency, args.context_budget
+            )
+            results[corpus][str(size)] = stages
+            for stage, metrics in stages.items():
+                print(
+                    f"{corpus:>9} {size:>6} {stage:<18} "
+                    f"p50 {metrics['p50_s'] * 1000:9.2f}ms  p99 {metrics['p99_s'] * 1000:9.2f}ms  "
+                    f"{metrics['throughput_per_s']:10.1f} sent/s  peak {metrics['peak_traced_mb']:8.1f}MB"
+                )
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
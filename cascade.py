@@ -0,0 +1,185 @@
+"""Skip the classifier for sentences a linear probe is confident are non-political.
+
+Usage:
+    python cascade.py speeches/*.txt --output probe.npz --min-agreement 0.98
+
+A logistic-regression probe on the sentence embeddings Segmenter already
+computes predicts whether manifestoberta's top category would be "000 - No
+meaningful category applies". Sentences scored above the probe's threshold get
+the neutral result (all probability on 000, which projects to (0, 0)); only the
+rest are classified. Training prints skip rate and agreement per threshold and
+saves the probe at the lowest threshold that meets --min-agreement.
+"""
+import argparse
+import asyncio
+
+import numpy as np
+
+from corpus import take
+from telemetry import telemetry
+
+NEUTRAL_CODE = "000"
+
+
+def neutral_index(id2label):
+    for index, label in id2label.items():
+        if label.startswith(NEUTRAL_CODE):
+            return int(index)
+    raise ValueError(f"No {NEUTRAL_CODE} label among the classifier's labels")
+
+
+class CascadeProbe:
+    """Linear probe over sentence embeddings that routes confident 000 sentences around the classifier."""
+
+    def __init__(self, weights, bias, threshold, embedding_model):
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.bias = float(bias)
+        self.threshold = float(threshold)
+        self.embedding_model = embedding_model
+        self.dim = len(self.weights)
+        self.skipped = 0
+        self.classified = 0
+
+    @classmethod
+    def fit(cls, embeddings, reference_probs, id2label, embedding_model, threshold=0.9, C=1.0):
+        """Fit on embeddings labelled by whether the reference top category is 000."""
+        from sklearn.linear_model import LogisticRegression
+
+        targets = np.argmax(reference_probs, axis=1) == neutral_index(id2label)
+        model = LogisticRegression(C=C, max_iter=1000)
+        model.fit(np.asarray(embeddings, dtype=np.float32), targets)
+        return cls(model.coef_[0], model.intercept_[0], threshold, embedding_model)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path, allow_pickle=False)
+        return cls(data["weights"], data["bias"], data["threshold"], str(data["embedding_model"]))
+
+    def save(self, path):
+        np.savez(
+            path,
+            weights=self.weights,
+            bias=self.bias,
+            threshold=self.threshold,
+            embedding_model=self.embedding_model,
+        )
+
+    def scores(self, embeddings):
+        """Probability that each sentence's top category is 000."""
+        logits = np.asarray(embeddings, dtype=np.float32) @ self.weights + self.bias
+        return 1 / (1 + np.exp(-logits))
+
+    def skip_mask(self, embeddings, threshold=None):
+        return self.scores(embeddings) >= (self.threshold if threshold is None else threshold)
+
+    def probabilities(self, engine, pairs, embeddings, batch_size=None, encoded=None):
+        """engine.probabilities for pairs, with confidently neutral rows answered without the model."""
+        probs = np.zeros((len(pairs), len(engine.id2label)), dtype=np.float32)
+        if not pairs:
+            return probs
+        skip = self.skip_mask(embeddings)
+        probs[skip, neutral_index(engine.id2label)] = 1
+        rest = np.flatnonzero(~skip)
+        if len(rest):
+            probs[rest] = engine.probabilities(
+                take(pairs, rest),
+                batch_size=batch_size,
+                encoded=None if encoded is None else take(encoded, rest),
+            )
+        self.skipped += int(skip.sum())
+        self.classified += len(rest)
+        telemetry.count("cascade_skipped", int(skip.sum()))
+        telemetry.count("cascade_classified", len(rest))
+        return probs
+
+    @property
+    def skip_rate(self):
+        total = self.skipped + self.classified
+        return self.skipped / total if total else 0.0
+
+
+def evaluate(probe, embeddings, reference_probs, id2label, projection, thresholds, top_k=3):
+    """Skip rate and agreement with the full classifier at each threshold.
+
+    agreement is the share of skipped sentences whose reference top category
+    really is 000; top1_agreement and mean_point_drift compare the cascade's
+    combined output with the reference over all sentences.
+    """
+    from projection import project
+
+    neutral = neutral_index(id2label)
+    reference_top = np.argmax(reference_probs, axis=1)
+    reference_points = project(reference_probs, projection, top_k=top_k)
+    scores = probe.scores(embeddings)
+    report = []
+    for threshold in thresholds:
+        skip = scores >= threshold
+        probs = np.array(reference_probs, copy=True)
+        probs[skip] = 0
+        probs[skip, neutral] = 1
+        drift = np.linalg.norm(project(probs, projection, top_k=top_k) - reference_points, axis=1)
+        report.append({
+            "threshold": float(threshold),
+            "skip_rate": float(skip.mean()),
+            "agreement": float((reference_top[skip] == neutral).mean()) if skip.any() else 1.0,
+            "top1_agreement": float((np.argmax(probs, axis=1) == reference_top).mean()),
+            "mean_point_drift": float(drift.mean()),
+        })
+    return report
+
+
+async def _collect(texts, embedding_backend):
+    from segmenter import Segmenter
+
+    embeddings, probs = [], []
+    for text in texts:
+        segmenter = Segmenter(text, embedding_backend=embedding_backend)
+        await segmenter.initialize()
+        segmenter.analyze()
+        embeddings.append(segmenter.sentence_embeddings)
+        probs.append(segmenter._probs)
+    return np.vstack(embeddings), np.vstack(probs)
+
+
+def main():
+    from registry import resources
+    from segmenter import Segmenter
+
+    parser = argparse.ArgumentParser(description="Train and evaluate the cascade probe against the full classifier.")
+    parser.add_argument("files", nargs="+", help="Text files to label with the full classifier")
+    parser.add_argument("--output", required=True, help="Where to save the probe (.npz)")
+    parser.add_argument("--embedding-backend", choices=["openai", "local"], default="openai")
+    parser.add_argument("--min-agreement", type=float, default=0.98, help="Required share of skipped sentences that are really 000")
+    parser.add_argument("--holdout", type=float, default=0.25, help="Fraction of sentences held out for evaluation")
+    args = parser.parse_args()
+
+    texts = []
+    for path in args.files:
+        with open(path, encoding="utf-8") as f:
+            texts.append(f.read())
+    embedding_backend = Segmenter._resolve_embedding_backend(args.embedding_backend)
+    embeddings, probs = asyncio.run(_collect(texts, embedding_backend))
+    engine = resources.get("engine")
+
+    order = np.random.default_rng(0).permutation(len(embeddings))
+    cut = int(len(order) * (1 - args.holdout))
+    train, test = order[:cut], order[cut:]
+    probe = CascadeProbe.fit(embeddings[train], probs[train], engine.id2label, embedding_backend.name)
+
+    report = evaluate(probe, embeddings[test], probs[test], engine.id2label, engine.projection, np.linspace(0.5, 0.99, 50))
+    for row in report:
+        print(
+            f"threshold {row['threshold']:.2f}  skip {row['skip_rate']:.3f}  agreement {row['agreement']:.3f}  "
+            f"top1 {row['top1_agreement']:.3f}  drift {row['mean_point_drift']:.3f}"
+        )
+    passing = [row for row in report if row["agreement"] >= args.min_agreement and row["skip_rate"] > 0]
+    if not passing:
+        print(f"No threshold reaches {args.min_agreement} agreement; probe not saved")
+        return
+    probe.threshold = passing[0]["threshold"]
+    probe.save(args.output)
+    print(f"Saved probe with threshold {probe.threshold:.2f} (skip rate {passing[0]['skip_rate']:.3f}) to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Check Segmenter.update against a from-scratch analysis over random edits.
+
+Usage:
+    python check_incremental.py
+    python check_incremental.py --trials 50 --edits 10 --modes chars
+
+Each trial analyzes a random corpus, then applies --edits random edit
+sequences (insertions, deletions and replacements of whole sentences) through
+Segmenter.update. After every edit the similarity contexts and points must
+equal those of a fresh Segmenter built on the edited corpus, and the median
+must be as good. Segmentation, embeddings, the tokenizer and the classifier
+are deterministic fakes, so no model or API key is needed.
+"""
+import argparse
+import asyncio
+import hashlib
+import random
+import sys
+import types
+
+import numpy as np
+
+from constants import category_ideology_mapping
+from embeddings import EmbeddingBackend
+from engine import InferenceEngine
+from projection import build_projection_matrix
+from registry import resources
+from segmenter import Segmenter
+from telemetry import telemetry
+
+MODES = ("tokens", "chars")
+
+
+def _seed(*parts):
+    return int(hashlib.md5("\x00".join(parts).encode("utf-8")).hexdigest()[:8], 16)
+
+
+class FakeSentencizer:
+    """Stands in for spaCy: one sentence per line."""
+
+    def __call__(self, text):
+        return types.SimpleNamespace(sents=[types.SimpleNamespace(text=line) for line in text.split("\n")])
+
+
+class FakeEmbeddingBackend(EmbeddingBackend):
+    """Deterministic random vectors per sentence."""
+
+    name = "fake"
+    dim = 8
+
+    async def embed(self, texts):
+        return np.array(
+            [np.random.default_rng(_seed(text)).normal(size=self.dim) for text in texts],
+            dtype=np.float32,
+        )
+
+
+class FakeTokenizer:
+    """One token per four characters of each word, so joined contexts tokenize like their parts."""
+
+    def __call__(self, texts, add_special_tokens=False):
+        return {"input_ids": [self.tokenize(text) for text in texts]}
+
+    @staticmethod
+    def tokenize(text):
+        return [_seed(word[start:start + 4]) % 30_000 for word in text.split() for start in range(0, len(word), 4)]
+
+    def num_special_tokens_to_add(self, pair=False):
+        return 4
+
+
+class FakeEngine(InferenceEngine):
+    """Deterministic probabilities per (sentence, context) pair; checks token-budgeted inputs."""
+
+    def __init__(self, max_length=40):
+        self.name = "fake"
+        self.batch_size = 4
+        self.max_length = max_length
+        self.tokenizer = FakeTokenizer()
+        self.id2label = dict(enumerate(category_ideology_mapping))
+        self.projection = build_projection_matrix(self.id2label)
+
+    def probabilities(self, pairs, batch_size=None, encoded=None):
+        if encoded is not None:
+            for (_, context), (sentence_ids, context_ids) in zip(pairs, encoded):
+                assert list(context_ids) == self.tokenize(context or ""), "context IDs differ from its text"
+                assert len(sentence_ids) + len(context_ids) <= self.context_budget or not context_ids, "over budget"
+        probs = np.array(
+            [np.random.default_rng(_seed(sentence, context or "")).random(len(self.id2label)) for sentence, context in pairs],
+            dtype=np.float32,
+        ).reshape(len(pairs), len(self.id2label))
+        return probs / np.maximum(probs.sum(axis=1, keepdims=True), 1e-12)
+
+    def tokenize(self, text):
+        return self.tokenizer.tokenize(text)
+
+
+def random_edit(rng, sentences, vocabulary):
+    edited = list(sentences)
+    for _ in range(rng.randint(1, 3)):
+        op = rng.random()
+        if op < 0.4 and edited:
+            edited.pop(rng.randrange(len(edited)))
+        elif op < 0.8:
+            edited.insert(rng.randrange(len(edited) + 1), f"{rng.choice(vocabulary)} {rng.randrange(10_000)}")
+        elif edited:
+            edited[rng.randrange(len(edited))] = rng.choice(vocabulary)
+    return edited or [vocabulary[0]]
+
+
+def analyze(corpus, mode):
+    segmenter = Segmenter(corpus, embedding_backend=FakeEmbeddingBackend(), engine=FakeEngine(), context_budget=mode)
+    asyncio.run(segmenter.initialize())
+    return segmenter, segmenter.analyze()
+
+
+def median_cost(median, points):
+    return np.linalg.norm(points - median, axis=1).sum()
+
+
+def check(mode, trials, edits, seed):
+    """Return (edits checked, mismatches, rows re-packed) for one context budget mode."""
+    rng = random.Random(seed)
+    vocabulary = [
+        " ".join("".join(rng.choice("abcdefgh") for _ in range(rng.randint(2, 9))) for _ in range(rng.randint(1, 16)))
+        for _ in range(60)
+    ]
+    checked = failed = 0
+    with telemetry.collect() as sink:
+        for trial in range(trials):
+            sentences = rng.sample(vocabulary, rng.randint(1, 40))
+            segmenter, _ = analyze("\n".join(sentences), mode)
+            for edit in range(edits):
+                sentences = random_edit(rng, sentences, vocabulary)
+                corpus = "\n".join(sentences)
+                updated = asyncio.run(segmenter.update(corpus))
+                reference_segmenter, reference = analyze(corpus, mode)
+                checked += 1
+                problems = []
+                if list(segmenter.context) != list(reference_segmenter.context):
+                    problems.append("contexts")
+                if not np.allclose(updated.points, reference.points):
+                    problems.append("points")
+                elif median_cost(updated.median, updated.points) > median_cost(reference.median, reference.points) + 1e-4:
+                    problems.append("median")
+                if problems:
+                    failed += 1
+                    print(f"{mode}: trial {trial} edit {edit}: {', '.join(problems)} differ", file=sys.stderr)
+    return checked, failed, int(sink.counters["context_repacked"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check incremental Segmenter updates against full re-analysis.")
+    parser.add_argument("--trials", type=int, default=16)
+    parser.add_argument("--edits", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    args = parser.parse_args()
+
+    resources.register("spacy:en_core_web_sm", FakeSentencizer)
+    failures = 0
+    for mode in args.modes:
+        checked, failed, repacked = check(mode, args.trials, args.edits, args.seed)
+        failures += failed
+        print(f"{mode}: {checked - failed}/{checked} edits match ({repacked} rows re-packed)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
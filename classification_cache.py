@@ -0,0 +1,144 @@
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from corpus import take
+from engine import InferenceEngine
+from telemetry import telemetry
+
+
+def pair_key(engine_name, tokenizer_name, max_length, sentence, context):
+    """Hash of everything that determines the classifier output for one pair."""
+    payload = "\x00".join([engine_name, tokenizer_name, str(max_length), sentence, context or ""])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ClassificationCache:
+    """Full probability vectors per (sentence, context) pair.
+
+    An in-memory LRU tier of ``capacity`` entries sits in front of an optional
+    SQLite tier at ``path`` that persists across processes and restarts.
+    """
+
+    def __init__(self, capacity=10_000, path=None):
+        self.capacity = capacity
+        self.path = path
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path is not None:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS probs (key TEXT PRIMARY KEY, probs BLOB)")
+            self._db.commit()
+
+    def _remember(self, key, probs):
+        self._memory[key] = probs
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.capacity:
+            self._memory.popitem(last=False)
+
+    def get_many(self, keys):
+        results = [None] * len(keys)
+        with self._lock:
+            missing = []
+            for i, key in enumerate(keys):
+                probs = self._memory.get(key)
+                if probs is None:
+                    missing.append(i)
+                    continue
+                self._memory.move_to_end(key)
+                self.hits += 1
+                results[i] = probs
+
+            if self._db is not None and missing:
+                found = {}
+                unique = list(dict.fromkeys(keys[i] for i in missing))
+                for start in range(0, len(unique), 500):
+                    chunk = unique[start:start + 500]
+                    rows = self._db.execute(
+                        f"SELECT key, probs FROM probs WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                    )
+                    for key, blob in rows:
+                        found[key] = np.frombuffer(blob, dtype=np.float32)
+                for i in missing:
+                    probs = found.get(keys[i])
+                    if probs is not None:
+                        self.disk_hits += 1
+                        self._remember(keys[i], probs)
+                        results[i] = probs
+            self.misses += sum(1 for probs in results if probs is None)
+        return results
+
+    def put_many(self, keys, probs):
+        with self._lock:
+            rows = []
+            for key, row in zip(keys, probs):
+                row = np.ascontiguousarray(row, dtype=np.float32)
+                self._remember(key, row)
+                rows.append((key, row.tobytes()))
+            if self._db is not None:
+                self._db.executemany("INSERT OR REPLACE INTO probs (key, probs) VALUES (?, ?)", rows)
+                self._db.commit()
+
+    def stats(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+
+class CachedEngine(InferenceEngine):
+    """Serves probabilities from a ClassificationCache and only classifies the misses."""
+
+    def __init__(self, engine, cache):
+        self.engine = engine
+        self.cache = cache
+        self.name = engine.name
+        self.tokenizer = getattr(engine, "tokenizer", None)
+        self.batch_size = engine.batch_size
+        self.max_length = getattr(engine, "max_length", 300)
+        self.id2label = engine.id2label
+        self.projection = engine.projection
+        self._tokenizer_name = getattr(self.tokenizer, "name_or_path", "")
+
+    @property
+    def token_cache(self):
+        return self.engine.token_cache
+
+    def probabilities(self, pairs, batch_size=None, encoded=None):
+        keys = [
+            pair_key(self.name, self._tokenizer_name, self.max_length, sentence, context)
+            for sentence, context in pairs
+        ]
+        cached = self.cache.get_many(keys)
+        probs = np.zeros((len(pairs), len(self.id2label)), dtype=np.float32)
+
+        misses = {}
+        for i, (key, row) in enumerate(zip(keys, cached)):
+            if row is None:
+                misses.setdefault(key, []).append(i)
+            else:
+                probs[i] = row
+        telemetry.count("classification_cache_hits", len(pairs) - sum(len(indices) for indices in misses.values()))
+        telemetry.count("classification_cache_misses", len(misses))
+        if misses:
+            first = [indices[0] for indices in misses.values()]
+            computed = self.engine.probabilities(
+                take(pairs, first),
+                batch_size=batch_size,
+                encoded=None if encoded is None else take(encoded, first),
+            )
+            self.cache.put_many(list(misses), computed)
+            for row, indices in zip(computed, misses.values()):
+                probs[indices] = row
+        return probs
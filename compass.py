@@ -0,0 +1,125 @@
+import functools
+import io
+import threading
+
+import numpy as np
+from matplotlib import style
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.colors import LogNorm
+from matplotlib.figure import Figure
+from matplotlib.image import imsave
+from matplotlib.lines import Line2D
+
+LIMIT = 10
+
+QUADRANT_COLORS = {
+    'top_left': '#FFB3BA',      # Soft Pink (Liberal)
+    'top_right': '#BAFFC9',     # Soft Green (Libertarian)
+    'bottom_left': '#BAE1FF',   # Soft Blue (Socialist)
+    'bottom_right': '#FFE9BA'   # Soft Yellow (Conservative)
+}
+
+
+def _draw_background(ax):
+    ax.axhline(y=0, color='gray', linestyle='--', linewidth=0.5)
+    ax.axvline(x=0, color='gray', linestyle='--', linewidth=0.5)
+
+    ax.fill_between([-LIMIT, 0], 0, LIMIT, color=QUADRANT_COLORS['top_left'], alpha=0.3)
+    ax.fill_between([0, LIMIT], 0, LIMIT, color=QUADRANT_COLORS['top_right'], alpha=0.3)
+    ax.fill_between([-LIMIT, 0], -LIMIT, 0, color=QUADRANT_COLORS['bottom_left'], alpha=0.3)
+    ax.fill_between([0, LIMIT], -LIMIT, 0, color=QUADRANT_COLORS['bottom_right'], alpha=0.3)
+
+    ax.text(-5, 9, 'AuthLeft', horizontalalignment='center', fontsize=10)
+    ax.text(5, 9, 'AuthRight', horizontalalignment='center', fontsize=10)
+    ax.text(-5, -1, 'LibLeft', horizontalalignment='center', fontsize=10)
+    ax.text(5, -1, 'LibRight', horizontalalignment='center', fontsize=10)
+
+    ax.set_title('Political Ideology Embedding', fontsize=15)
+    ax.set_xlabel('Economic Axis (Left ← → Right)', fontsize=12)
+    ax.set_ylabel('Social Axis (Liberal ↑ → Conservative ↓)', fontsize=12)
+    ax.set_xlim(-LIMIT, LIMIT)
+    ax.set_ylim(-LIMIT, LIMIT)
+    ax.set_autoscale_on(False)
+    ax.grid(True, linestyle='--', linewidth=0.5)
+    ax.legend(handles=[Line2D(
+        [], [], color='red', marker='*', markersize=14, markeredgecolor='black', linestyle='None', label='Corpus Median',
+    )], loc='lower right')
+
+
+class CompassRenderer:
+    """Draws points and a median onto a political compass rendered once and reused.
+
+    The quadrants, labels and grid are drawn a single time and kept as a
+    pixel buffer; each render restores that buffer and draws only the data
+    on top. Above density_threshold points the data is drawn as a 2D histogram,
+    so rendering cost no longer grows with the corpus.
+    """
+
+    def __init__(self, size=8, dpi=100, density_threshold=2000, bins=80):
+        self.density_threshold = density_threshold
+        self.bins = bins
+        self._lock = threading.Lock()
+        with style.context('ggplot'):
+            self.figure = Figure(figsize=(size, size), dpi=dpi)
+            self.canvas = FigureCanvasAgg(self.figure)
+            self.ax = self.figure.add_subplot()
+            _draw_background(self.ax)
+            self.figure.tight_layout()
+        self.canvas.draw()
+        self._background = self.canvas.copy_from_bbox(self.figure.bbox)
+
+    def _artists(self, points, median, density):
+        artists = []
+        if density:
+            counts, _, _ = np.histogram2d(
+                points[:, 0], points[:, 1], bins=self.bins, range=[[-LIMIT, LIMIT], [-LIMIT, LIMIT]]
+            )
+            artists.append(self.ax.imshow(
+                np.ma.masked_equal(counts.T, 0),
+                origin='lower',
+                extent=(-LIMIT, LIMIT, -LIMIT, LIMIT),
+                aspect='auto',
+                cmap='Blues',
+                norm=LogNorm(vmin=1, vmax=max(counts.max(), 1)),
+                interpolation='nearest',
+                alpha=0.75,
+            ))
+        elif len(points):
+            artists.append(self.ax.scatter(
+                points[:, 0], points[:, 1], c='blue', alpha=0.6, edgecolors='black', linewidth=0.5
+            ))
+        if median is not None:
+            artists.append(self.ax.scatter(
+                [median[0]], [median[1]], c='red', s=200, marker='*', edgecolors='black', linewidth=1
+            ))
+        return artists
+
+    def render(self, points, median=None, density=None):
+        """Return the compass as an (H, W, 4) uint8 RGBA array.
+
+        density=None picks the histogram automatically above density_threshold points.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if density is None:
+            density = len(points) > self.density_threshold
+        with self._lock:
+            self.canvas.restore_region(self._background)
+            artists = self._artists(points, median, density)
+            try:
+                for artist in artists:
+                    self.ax.draw_artist(artist)
+                return np.array(self.canvas.buffer_rgba())
+            finally:
+                for artist in artists:
+                    artist.remove()
+
+    def render_png(self, points, median=None, density=None):
+        buffer = io.BytesIO()
+        imsave(buffer, self.render(points, median, density), format='png')
+        return buffer.getvalue()
+
+
+@functools.lru_cache(maxsize=None)
+def get_renderer(size=8, dpi=100, density_threshold=2000):
+    """Shared renderer per figure size, so the background is drawn once per process."""
+    return CompassRenderer(size=size, dpi=dpi, density_threshold=density_threshold)
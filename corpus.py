@@ -0,0 +1,95 @@
+from collections.abc import Sequence
+from operator import index
+
+import numpy as np
+
+
+class SentenceBuffer(Sequence):
+    """Sentences stored as one string plus an int64 array of end offsets.
+
+    Behaves like a read-only list of str; each sentence is sliced out of the
+    buffer when it is accessed.
+    """
+
+    def __init__(self, sentences=()):
+        sentences = list(sentences)
+        self.text = "".join(sentences)
+        self.ends = np.cumsum([len(sentence) for sentence in sentences], dtype=np.int64)
+
+    def __len__(self):
+        return len(self.ends)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        i = index(i)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("sentence index out of range")
+        start = int(self.ends[i - 1]) if i else 0
+        return self.text[start:int(self.ends[i])]
+
+    def __eq__(self, other):
+        return isinstance(other, Sequence) and len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __repr__(self):
+        return f"SentenceBuffer({len(self)} sentences, {len(self.text)} chars)"
+
+
+class Ragged(Sequence):
+    """Variable-length integer rows (neighbor lists, token IDs) in one flat array with offsets."""
+
+    def __init__(self, values, offsets):
+        self.values = values
+        self.offsets = offsets
+
+    @classmethod
+    def from_lists(cls, rows, dtype=np.int32):
+        lengths = np.fromiter((len(row) for row in rows), dtype=np.int64, count=len(rows))
+        offsets = np.concatenate([[0], np.cumsum(lengths)])
+        values = np.fromiter((value for row in rows for value in row), dtype=dtype, count=int(offsets[-1]))
+        return cls(values, offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        i = index(i)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("row index out of range")
+        return self.values[self.offsets[i]:self.offsets[i + 1]]
+
+    def lengths(self):
+        return np.diff(self.offsets)
+
+
+class LazySequence(Sequence):
+    """Read-only sequence whose items are built by item(i) on access and never stored."""
+
+    def __init__(self, length, item):
+        self._length = length
+        self._item = item
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        i = index(i)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("index out of range")
+        return self._item(i)
+
+    def __eq__(self, other):
+        return isinstance(other, Sequence) and len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+
+def take(sequence, indices):
+    """Lazy view of sequence at indices, so subsets of lazy pairs stay lazy."""
+    return LazySequence(len(indices), lambda k: sequence[indices[k]])
@@ -0,0 +1,267 @@
+import atexit
+import contextlib
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Bytes of the sha256 digest stored per row.
+KEY_BYTES = 32
+
+
+def default_cache_dir():
+    return os.environ.get(
+        "POLCOMPASS_CACHE_DIR",
+        os.path.join(os.path.expanduser("~"), ".cache", "polcompass"),
+    )
+
+
+def default_embeddings_dir(model, dim):
+    """Per model and dimension, so caches for different backends never share files."""
+    name = re.sub(r"[^A-Za-z0-9._-]+", "_", model) if model else "default"
+    return os.path.join(default_cache_dir(), "embeddings", f"{name}-{dim}")
+
+
+def normalize_text(text):
+    return " ".join(text.split())
+
+
+def cache_key(model, text):
+    """Content hash of (model name, normalized sentence text)."""
+    return hashlib.sha256(f"{model}\x00{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Persistent LRU cache of float32 sentence embeddings.
+
+    Vectors live in a fixed-capacity memory-mapped ``vectors.f32`` file and
+    ``index.json`` maps content hashes to rows, least recently used first.
+    ``keys.bin`` holds the hash each row was written for and is checked on
+    every read, so a row reused after a crash or by another process is a miss,
+    never someone else's vector. Processes sharing a directory serialize
+    allocation and flushes with a lock on ``lock`` and reload the index under it.
+
+    Vectors and keys are synced on every put; index.json is rewritten only
+    once index_every new entries are pending, on flush() and at exit. Rows
+    signed in keys.bin but missing from the index (another process's recent
+    writes) are claimed before allocating, so they are not handed out twice.
+    A layout mismatch raises instead of re-creating files other processes may
+    have mapped; the default path is per model and dimension.
+    """
+
+    def __init__(self, path=None, dim=1536, capacity=50_000, model=None, index_every=4096):
+        self.path = path or default_embeddings_dir(model, dim)
+        self.dim = dim
+        self.capacity = capacity
+        self.index_every = index_every
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.path, exist_ok=True)
+        self._index_path = os.path.join(self.path, "index.json")
+        self._vectors_path = os.path.join(self.path, "vectors.f32")
+        self._keys_path = os.path.join(self.path, "keys.bin")
+        self._lock_path = os.path.join(self.path, "lock")
+        self._lock = threading.Lock()
+        self._slots = OrderedDict()
+        self._touched = OrderedDict()
+        self._pending = OrderedDict()
+        self._index_stamp = None
+
+        with self._lock, self._file_lock():
+            reuse = self._load_index()
+            mode = "r+" if reuse else "w+"
+            self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode=mode, shape=(capacity, dim))
+            self._keys = np.memmap(self._keys_path, dtype=np.uint8, mode=mode, shape=(capacity, KEY_BYTES))
+            if not reuse:
+                self._flush()
+        self._update_free()
+        atexit.register(self.flush)
+
+    @contextlib.contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(self._lock_path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _stamp(self):
+        try:
+            stat = os.stat(self._index_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _load_index(self):
+        """Read index.json; False if the cache does not exist yet.
+
+        Files from another layout are never re-created in place, since other
+        processes may still have them mapped.
+        """
+        paths = (self._index_path, self._vectors_path, self._keys_path)
+        present = [os.path.exists(path) for path in paths]
+        if not any(present):
+            return False
+        if not all(present):
+            raise ValueError(f"Incomplete embedding cache in {self.path}; delete the directory to start over")
+        with open(self._index_path) as f:
+            index = json.load(f)
+        if (
+            index.get("dim") != self.dim
+            or index.get("capacity") != self.capacity
+            or os.path.getsize(self._vectors_path) != self.capacity * self.dim * np.dtype(np.float32).itemsize
+            or os.path.getsize(self._keys_path) != self.capacity * KEY_BYTES
+        ):
+            raise ValueError(
+                f"Embedding cache in {self.path} holds {index.get('capacity')} x {index.get('dim')} vectors, "
+                f"not {self.capacity} x {self.dim}; use another path or delete the directory"
+            )
+        self._slots = OrderedDict((key, slot) for key, slot in index["entries"])
+        self._index_stamp = self._stamp()
+        return True
+
+    def _reload(self):
+        # Called under the file lock: pick up what other processes wrote, then
+        # re-apply this process's unindexed entries whose rows it still owns
+        # and its recent hits at the most-recently-used end.
+        if self._stamp() == self._index_stamp:
+            return
+        self._load_index()
+        owners = {slot: key for key, slot in self._slots.items()}
+        for key, slot in list(self._pending.items()):
+            if not np.array_equal(self._keys[slot], _digest(key)):
+                del self._pending[key]
+                continue
+            other = owners.get(slot)
+            if other is not None and other != key:
+                del self._slots[other]
+            self._slots[key] = slot
+        for key in self._touched:
+            if key in self._slots:
+                self._slots.move_to_end(key)
+        self._update_free()
+
+    def _adopt_unindexed(self):
+        # Rows another process wrote but has not indexed yet still carry their
+        # key; claim them so they are not handed out again.
+        if not self._free:
+            return
+        free = np.array(self._free, dtype=np.int64)
+        signed = free[self._keys[free].any(axis=1)]
+        for slot in signed.tolist():
+            key = self._keys[slot].tobytes().hex()
+            if key not in self._slots:
+                self._slots[key] = slot
+        if len(signed):
+            self._update_free()
+
+    def _update_free(self):
+        used = set(self._slots.values())
+        self._free = [slot for slot in range(self.capacity - 1, -1, -1) if slot not in used]
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, key):
+        return key in self._slots
+
+    def get_many(self, model, texts):
+        """Return a float32 vector per text, or None for misses."""
+        results = []
+        with self._lock:
+            for text in texts:
+                key = cache_key(model, text)
+                slot = self._slots.get(key)
+                vector = None
+                if slot is not None:
+                    digest = _digest(key)
+                    if np.array_equal(self._keys[slot], digest):
+                        vector = np.array(self._vectors[slot])
+                        # A writer clears the key before rewriting the row.
+                        if not np.array_equal(self._keys[slot], digest):
+                            vector = None
+                    if vector is None:
+                        del self._slots[key]
+                        self._pending.pop(key, None)
+                if vector is None:
+                    self.misses += 1
+                    results.append(None)
+                    continue
+                self.hits += 1
+                self._slots.move_to_end(key)
+                self._touched[key] = None
+                results.append(vector)
+        return results
+
+    def put_many(self, model, texts, vectors):
+        with self._lock, self._file_lock():
+            self._reload()
+            self._adopt_unindexed()
+            writes = {}
+            for text, vector in zip(texts, vectors):
+                key = cache_key(model, text)
+                slot = self._slots.get(key)
+                if slot is None:
+                    if self._free:
+                        slot = self._free.pop()
+                    else:
+                        evicted, slot = self._slots.popitem(last=False)
+                        self._pending.pop(evicted, None)
+                writes[slot] = (key, vector)
+                self._slots[key] = slot
+                self._slots.move_to_end(key)
+                self._pending[key] = slot
+            if not writes:
+                return
+            slots = np.fromiter(writes, dtype=np.int64, count=len(writes))
+            # Invalidate, write, then sign each row, so a crash or a concurrent
+            # reader never pairs a key with another sentence's vector.
+            self._keys[slots] = 0
+            self._keys.flush()
+            for slot, (_, vector) in writes.items():
+                self._vectors[slot] = np.asarray(vector, dtype=np.float32)
+            self._vectors.flush()
+            for slot, (key, _) in writes.items():
+                self._keys[slot] = _digest(key)
+            self._keys.flush()
+            if len(self._pending) >= self.index_every:
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            if not (self._pending or self._touched):
+                return
+            with self._file_lock():
+                self._reload()
+                self._flush()
+
+    def _flush(self):
+        self._vectors.flush()
+        self._keys.flush()
+        tmp_path = f"{self._index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {"dim": self.dim, "capacity": self.capacity, "entries": list(self._slots.items())},
+                f,
+            )
+        os.replace(tmp_path, self._index_path)
+        self._index_stamp = self._stamp()
+        self._touched.clear()
+        self._pending.clear()
+
+
+def _digest(key):
+    return np.frombuffer(bytes.fromhex(key), dtype=np.uint8)
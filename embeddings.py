@@ -0,0 +1,143 @@
+import asyncio
+import random
+
+import numpy as np
+import openai
+
+from registry import tokenizer_lock
+from telemetry import telemetry
+
+
+def estimate_tokens(text):
+    # Roughly 4 characters per token for English; err high so batches stay under budget.
+    return len(text) // 3 + 1
+
+
+def make_batches(texts, max_tokens=8000, max_inputs=256):
+    """Split text indices into consecutive batches bounded by estimated tokens and input count."""
+    batches, current, current_tokens = [], [], 0
+    for i, text in enumerate(texts):
+        tokens = estimate_tokens(text)
+        if current and (current_tokens + tokens > max_tokens or len(current) >= max_inputs):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def is_retryable(exc):
+    if isinstance(exc, (openai.RateLimitError, openai.APIConnectionError)):
+        return True
+    return isinstance(exc, openai.APIStatusError) and exc.status_code >= 500
+
+
+async def fetch_embeddings(
+    client,
+    texts,
+    model,
+    max_tokens=8000,
+    max_inputs=256,
+    max_concurrency=4,
+    max_retries=5,
+    backoff=0.5,
+):
+    """Embed texts with batched requests through at most max_concurrency in-flight calls.
+
+    Rate-limit, connection and 5xx errors are retried with jittered exponential
+    backoff. Vectors are returned in the order of texts.
+    """
+    results = [None] * len(texts)
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(batch):
+        async with semaphore:
+            for attempt in range(max_retries + 1):
+                telemetry.count("embedding_api_calls")
+                try:
+                    response = await client.embeddings.create(
+                        model=model,
+                        input=[texts[i] for i in batch],
+                    )
+                    break
+                except Exception as exc:
+                    if attempt == max_retries or not is_retryable(exc):
+                        raise
+                    telemetry.count("embedding_api_retries")
+                    await asyncio.sleep(backoff * 2 ** attempt * (1 + random.random()))
+        for item in response.data:
+            results[batch[item.index]] = item.embedding
+
+    if telemetry.enabled:
+        telemetry.count("embedding_tokens_estimated", sum(estimate_tokens(text) for text in texts))
+    await asyncio.gather(*(run(batch) for batch in make_batches(texts, max_tokens, max_inputs)))
+    return results
+
+
+class EmbeddingBackend:
+    """Turns sentences into an (N, dim) float32 matrix for the similarity stage."""
+
+    name = None
+    dim = None
+
+    async def embed(self, texts):
+        raise NotImplementedError
+
+
+class OpenAIEmbeddingBackend(EmbeddingBackend):
+    def __init__(self, client=None, model="text-embedding-3-small", dim=1536, max_concurrency=4):
+        self.client = client or openai.AsyncOpenAI()
+        self.name = model
+        self.dim = dim
+        self.max_concurrency = max_concurrency
+
+    async def embed(self, texts):
+        vectors = await fetch_embeddings(
+            self.client,
+            texts,
+            model=self.name,
+            max_concurrency=self.max_concurrency,
+        )
+        return np.asarray(vectors, dtype=np.float32).reshape(len(texts), self.dim)
+
+
+class LocalEmbeddingBackend(EmbeddingBackend):
+    """Mean-pooled last hidden layer of an already-loaded transformer, batched on CPU."""
+
+    def __init__(self, model, tokenizer, batch_size=32, max_length=128):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.name = f"local:{model.config.name_or_path}"
+        self.dim = model.config.hidden_size
+
+    async def embed(self, texts):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.embed_sync, texts)
+
+    def embed_sync(self, texts):
+        import torch
+
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        with torch.inference_mode():
+            for start in range(0, len(order), self.batch_size):
+                indices = order[start:start + self.batch_size]
+                # The tokenizer is shared with the classifier engine on other threads.
+                with tokenizer_lock(self.tokenizer):
+                    batch = self.tokenizer(
+                        [texts[i] for i in indices],
+                        max_length=self.max_length,
+                        truncation=True,
+                        padding=True,
+                        return_tensors="pt",
+                    )
+                # The encoder alone: no per-layer outputs and no classification head.
+                hidden = self.model.base_model(**batch).last_hidden_state
+                mask = batch["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+                pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+                vectors[indices] = pooled.float().cpu().numpy()
+        return vectors
@@ -0,0 +1,149 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import torch
+from projection import build_projection_matrix, project
+from registry import tokenizer_lock
+from telemetry import telemetry
+
+# Pairs are encoded and length-sorted this many classifier batches at a time,
+# so features for a whole corpus are never held at once.
+SORT_WINDOW_BATCHES = 64
+
+
+class TokenCache:
+    """Token IDs per sentence, without special tokens, so each distinct sentence is tokenized once."""
+
+    def __init__(self, tokenizer, capacity=100_000):
+        self.tokenizer = tokenizer
+        self.capacity = capacity
+        self._ids = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, sentences):
+        with self._lock:
+            misses = list(dict.fromkeys(sentence for sentence in sentences if sentence not in self._ids))
+            if misses:
+                with tokenizer_lock(self.tokenizer):
+                    encoded = self.tokenizer(misses, add_special_tokens=False)["input_ids"]
+                for sentence, ids in zip(misses, encoded):
+                    self._ids[sentence] = ids
+            results = []
+            for sentence in sentences:
+                self._ids.move_to_end(sentence)
+                results.append(self._ids[sentence])
+            while len(self._ids) > self.capacity:
+                self._ids.popitem(last=False)
+            return results
+
+
+class InferenceEngine:
+    """Batched, no-grad classifier over (sentence, context) pairs."""
+
+    def __init__(self, model, tokenizer, batch_size=16, max_length=300):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.model.eval()
+        self.name = model.config.name_or_path
+        self.id2label = model.config.id2label
+        self.projection = build_projection_matrix(self.id2label)
+
+    def _encode(self, pairs):
+        # Pairs are encoded one at a time so an empty context is treated exactly
+        # like the single-pair call `_infer` used to make.
+        with tokenizer_lock(self.tokenizer):
+            return [
+                self.tokenizer(sentence, context, max_length=self.max_length, truncation=True)
+                for sentence, context in pairs
+            ]
+
+    @property
+    def token_cache(self):
+        if getattr(self, "_token_cache", None) is None:
+            self._token_cache = TokenCache(self.tokenizer)
+        return self._token_cache
+
+    @property
+    def context_budget(self):
+        """Tokens a sentence and its context may use together, after the pair's special tokens."""
+        return self.max_length - self.tokenizer.num_special_tokens_to_add(pair=True)
+
+    def _encode_ids(self, encoded):
+        # Already-tokenized (sentence IDs, context IDs) pairs only need special
+        # tokens; truncation here only trims sentences longer than the budget.
+        with tokenizer_lock(self.tokenizer):
+            return [
+                self.tokenizer.prepare_for_model(
+                    sentence_ids,
+                    context_ids,
+                    max_length=self.max_length,
+                    truncation="longest_first",
+                )
+                for sentence_ids, context_ids in encoded
+            ]
+
+    def probabilities(self, pairs, batch_size=None, encoded=None):
+        """Return an (N, num_labels) float32 array of class probabilities in input order.
+
+        encoded optionally gives each pair as (sentence IDs, context IDs) from
+        the token cache, which skips tokenizing the text again. pairs and
+        encoded only need indexing, so they can be lazy sequences; they are
+        read SORT_WINDOW_BATCHES batches at a time.
+        """
+        batch_size = batch_size or self.batch_size
+        num_labels = len(self.id2label)
+        probs = np.zeros((len(pairs), num_labels), dtype=np.float32)
+        if not pairs:
+            return probs
+
+        tokens = 0
+        window = batch_size * SORT_WINDOW_BATCHES
+        with telemetry.span("classification", engine=self.name):
+            for window_start in range(0, len(pairs), window):
+                rows = range(window_start, min(window_start + window, len(pairs)))
+                if encoded is None:
+                    features = self._encode([pairs[i] for i in rows])
+                else:
+                    features = self._encode_ids([encoded[i] for i in rows])
+                # Sorting by length keeps similarly sized inputs together so each batch
+                # only pads up to its own longest sequence.
+                order = sorted(range(len(features)), key=lambda i: len(features[i]["input_ids"]))
+
+                for start in range(0, len(order), batch_size):
+                    indices = order[start:start + batch_size]
+                    probs[[window_start + i for i in indices]] = self._forward([features[i] for i in indices])
+                tokens += sum(len(feature["input_ids"]) for feature in features)
+        if telemetry.enabled:
+            telemetry.count("classified_pairs", len(pairs))
+            telemetry.count("classifier_batches", -(-len(pairs) // batch_size))
+            telemetry.count("classifier_tokens", tokens)
+        return probs
+
+    def _forward(self, features):
+        """Pad one batch of encoded pairs and return its softmax probabilities."""
+        with tokenizer_lock(self.tokenizer):
+            batch = self.tokenizer.pad(features, return_tensors="pt")
+        with torch.inference_mode():
+            logits = self.model(**batch).logits
+            return torch.softmax(logits, dim=1).float().cpu().numpy()
+
+    def top_k(self, probs, top_k=3):
+        """Convert a probability matrix into per-row [(label, percent), ...] lists."""
+        probs = np.asarray(probs)
+        if probs.size == 0:
+            return [[] for _ in range(len(probs))]
+        order = np.argsort(-probs, axis=1, kind="stable")[:, :top_k]
+        percents = (np.take_along_axis(probs, order, axis=1).astype(np.float64) * 100).tolist()
+        return [
+            [(self.id2label[i], percent) for i, percent in zip(row_order, row_percents)]
+            for row_order, row_percents in zip(order.tolist(), percents)
+        ]
+
+    def classify(self, pairs, top_k=3, batch_size=None):
+        return self.top_k(self.probabilities(pairs, batch_size=batch_size), top_k=top_k)
+
+    def project(self, probs, top_k=None):
+        return project(probs, self.projection, top_k=top_k)
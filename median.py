@@ -0,0 +1,123 @@
+import numpy as np
+
+
+def _distances(X, y, mask):
+    D = np.sqrt(((X - y[:, np.newaxis, :]) ** 2).sum(axis=2))
+    return np.where(mask, D, np.inf)
+
+
+def _vardi_zhang_update(X, w, y, mask):
+    """Modified Weiszfeld update for a batch of padded point sets.
+
+    X is (B, M, d), w and mask are (B, M), y is (B, d). Away from the data this
+    is the plain Weiszfeld step; at a data point it shrinks the step by the
+    weight sitting there and stays put once the point is provably optimal.
+    Returns the next iterate and whether y is such an optimal data point.
+    """
+    D = _distances(X, y, mask)
+    coincident = mask & (D == 0)
+    eta = np.where(coincident, w, 0).sum(axis=1)
+    inverse = np.where(mask & ~coincident, w / np.where(coincident, 1, D), 0)
+    total = inverse.sum(axis=1)
+
+    has_others = total > 0
+    T = (inverse[:, :, np.newaxis] * X).sum(axis=1) / np.where(has_others, total, 1)[:, np.newaxis]
+    R = (inverse[:, :, np.newaxis] * (X - y[:, np.newaxis, :])).sum(axis=1)
+    r = np.sqrt((R ** 2).sum(axis=1))
+
+    optimal = ~has_others | ((eta > 0) & (r <= eta))
+    beta = np.where(eta > 0, eta / np.where(r > 0, r, 1), 0)
+    y_next = (1 - beta)[:, np.newaxis] * T + beta[:, np.newaxis] * y
+    return np.where(optimal[:, np.newaxis], y, y_next), optimal
+
+
+def _cost(X, w, y, mask):
+    return (w * np.where(mask, _distances(X, y, mask), 0)).sum(axis=1)
+
+
+def _step(X, w, y, mask):
+    y_next, _ = _vardi_zhang_update(X, w, y, mask)
+
+    # Weiszfeld approaches a data point slowly, whether the point is the
+    # optimum or just in the way. So also check the nearest data point directly:
+    # move onto it if it is optimal, otherwise take its Vardi-Zhang step when
+    # that lowers the objective more.
+    nearest = _distances(X, y, mask).argmin(axis=1)
+    point = X[np.arange(len(X)), nearest]
+    jump, optimal = _vardi_zhang_update(X, w, point, mask)
+    better = _cost(X, w, jump, mask) < _cost(X, w, y_next, mask)
+    y_next = np.where((~optimal & better)[:, np.newaxis], jump, y_next)
+    return np.where(optimal[:, np.newaxis], point, y_next)
+
+
+def batch_geometric_median(point_sets, weights=None, init=None, eps=1e-5, max_iter=1000):
+    """Solve many (possibly ragged) weighted geometric-median problems at once.
+
+    point_sets is a sequence of (n_i, d) arrays, weights an optional matching
+    sequence of (n_i,) arrays and init an optional (B, d) array of warm starts
+    (rows of NaN fall back to the weighted mean). Returns (medians, info) where
+    medians is (B, d), NaN for empty sets, and info holds per-set "iterations"
+    and "converged" arrays plus the final "step" sizes.
+    """
+    # Repeated points (e.g. every sentence scored exactly (0, 0)) are merged
+    # into one weighted point, which keeps the padded arrays small.
+    merged = []
+    for b, points in enumerate(point_sets):
+        points = np.asarray(points, dtype=np.float64)
+        point_weights = np.ones(len(points)) if weights is None else np.asarray(weights[b], dtype=np.float64)
+        if len(points):
+            points, inverse = np.unique(points, axis=0, return_inverse=True)
+            point_weights = np.bincount(inverse.ravel(), weights=point_weights, minlength=len(points))
+        merged.append((points, point_weights))
+
+    batch = len(merged)
+    dim = next((points.shape[1] for points, _ in merged if len(points)), 2)
+    width = max([len(points) for points, _ in merged] + [1])
+    X = np.zeros((batch, width, dim))
+    w = np.zeros((batch, width))
+    for b, (points, point_weights) in enumerate(merged):
+        X[b, :len(points)] = points
+        w[b, :len(points)] = point_weights
+    mask = w > 0
+
+    totals = w.sum(axis=1)
+    nonempty = totals > 0
+    y = (w[:, :, np.newaxis] * X).sum(axis=1) / np.where(nonempty, totals, 1)[:, np.newaxis]
+    if init is not None:
+        init = np.asarray(init, dtype=np.float64).reshape(batch, dim)
+        y = np.where(np.isnan(init).any(axis=1)[:, np.newaxis], y, init)
+
+    # A heavy point is often the answer outright; Weiszfeld would only creep up on it.
+    heaviest = X[np.arange(batch), w.argmax(axis=1)]
+    _, optimal = _vardi_zhang_update(X, w, heaviest, mask)
+    y = np.where((nonempty & optimal)[:, np.newaxis], heaviest, y)
+
+    iterations = np.zeros(batch, dtype=np.int64)
+    step = np.full(batch, np.inf)
+    active = nonempty.copy()
+    for _ in range(max_iter):
+        if not active.any():
+            break
+        rows = np.flatnonzero(active)
+        y_next = _step(X[rows], w[rows], y[rows], mask[rows])
+        step[rows] = np.sqrt(((y_next - y[rows]) ** 2).sum(axis=1))
+        y[rows] = y_next
+        iterations[rows] += 1
+        active[rows] = step[rows] >= eps
+
+    converged = nonempty & (step < eps)
+    y[~nonempty] = np.nan
+    return y, {"iterations": iterations, "converged": converged, "step": step}
+
+
+def geometric_median(X, weights=None, init=None, eps=1e-5, max_iter=1000):
+    """Weighted geometric median of one (n, d) point set; returns (median, info)."""
+    X = np.asarray(X, dtype=np.float64)
+    medians, info = batch_geometric_median(
+        [X],
+        weights=None if weights is None else [np.asarray(weights, dtype=np.float64)],
+        init=None if init is None else np.asarray(init, dtype=np.float64)[np.newaxis],
+        eps=eps,
+        max_iter=max_iter,
+    )
+    return medians[0], {key: value[0].item() for key, value in info.items()}
@@ -0,0 +1,128 @@
+import numpy as np
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+
+def normalize(embeddings):
+    """L2-normalize rows into a contiguous float32 matrix."""
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return embeddings / norms
+
+
+def _rank(indices, similarities):
+    # Similarity descending, ties broken by higher index first, matching a
+    # reversed ascending argsort.
+    order = np.lexsort((-indices, -similarities), axis=-1)
+    return np.take_along_axis(indices, order, axis=-1), np.take_along_axis(similarities, order, axis=-1)
+
+
+class NeighborIndex:
+    """Cosine nearest-neighbor search without materializing the N x N similarity matrix.
+
+    Exact search multiplies one block of queries against the corpus at a time
+    and keeps the top k with argpartition. With approximate=True an HNSW index
+    from faiss is used instead, for corpora too large for exact search.
+    """
+
+    def __init__(self, embeddings, block_size=256, approximate=False):
+        self.embeddings = normalize(embeddings)
+        self.block_size = block_size
+        self._ann = None
+        if approximate:
+            if faiss is None:
+                raise ImportError("Approximate neighbor search requires the faiss package")
+            self._ann = faiss.IndexHNSWFlat(self.embeddings.shape[1], 32, faiss.METRIC_INNER_PRODUCT)
+            self._ann.add(self.embeddings)
+
+    def __len__(self):
+        return len(self.embeddings)
+
+    def search(self, rows, k):
+        """Return (indices, similarities) of the k nearest rows for each query row, best first."""
+        n = len(self)
+        k = min(k, n)
+        queries = self.embeddings[rows]
+        if self._ann is not None:
+            similarities, indices = self._ann.search(queries, k)
+            return _rank(indices.astype(np.int64), similarities)
+
+        similarities = queries @ self.embeddings.T
+        if k < n:
+            indices = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        else:
+            indices = np.broadcast_to(np.arange(n), similarities.shape).copy()
+        return _rank(indices, np.take_along_axis(similarities, indices, axis=1))
+
+    def full_order(self, i):
+        """Every row ranked by similarity to row i, with the similarities."""
+        return _rank(np.arange(len(self)), self.embeddings @ self.embeddings[i])
+
+
+def pack_neighbors(i, candidates, similarities, lengths, budget=300, min_length=0):
+    """Greedily pick neighbor sentences for row i until no other sentence can fit.
+
+    lengths holds each sentence's size in the budget's unit (characters or
+    tokens); row i's own length counts against the budget. Returns the chosen
+    indices, the similarity of the last one chosen (+inf if none) and the
+    budget left over. The row is finished once the leftover is below
+    min_length, the shortest sentence in the corpus: then no candidate less
+    similar than the cutoff could change the result.
+    """
+    used = []
+    remaining = budget - lengths[i]
+    cutoff = np.inf
+    for j, similarity in zip(candidates, similarities):
+        if remaining < min_length:
+            break
+        if j < 0 or i == j or lengths[j] > remaining:
+            continue
+        used.append(int(j))
+        remaining -= lengths[j]
+        cutoff = float(similarity)
+    return used, cutoff, remaining
+
+
+def join_context(used, sentences):
+    context = ""
+    for j in used:
+        context += sentences[j] + " "
+    return context.strip()
+
+
+def join_ids(used, token_ids):
+    """Context token IDs: the neighbors' cached sentence IDs laid end to end."""
+    return [int(token) for j in used for token in token_ids[j]]
+
+
+def iter_context_neighbors(sentences, embeddings, rows=None, k=32, block_size=256, budget=300, approximate=False, lengths=None):
+    """Yield (row, neighbor indices, cutoff similarity, leftover budget) for rows (default: all), one query block at a time.
+
+    The budget is in characters unless lengths gives per-sentence sizes in another unit.
+    """
+    if lengths is None:
+        lengths = [len(sentence) for sentence in sentences]
+    index = NeighborIndex(embeddings, block_size=block_size, approximate=approximate)
+    n = len(index)
+    min_length = min(lengths) if n else 0
+    rows = np.arange(n) if rows is None else np.asarray(rows, dtype=np.int64)
+    for start in range(0, len(rows), block_size):
+        block = rows[start:start + block_size]
+        neighbors, similarities = index.search(block, k + 1)
+        for i, candidates, candidate_similarities in zip(block.tolist(), neighbors, similarities):
+            used, cutoff, remaining = pack_neighbors(i, candidates, candidate_similarities, lengths, budget, min_length)
+            search_k = k + 1
+            while remaining >= min_length and search_k < n:
+                # The top k ran out before the budget did; search again with a larger k.
+                search_k = min(search_k * 4, n)
+                if search_k == n:
+                    candidates, candidate_similarities = index.full_order(i)
+                else:
+                    found, found_similarities = index.search(np.array([i]), search_k)
+                    candidates, candidate_similarities = found[0], found_similarities[0]
+                used, cutoff, remaining = pack_neighbors(i, candidates, candidate_similarities, lengths, budget, min_length)
+            yield i, used, cutoff, remaining
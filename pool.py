@@ -0,0 +1,78 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from engine import InferenceEngine
+from projection import build_projection_matrix
+from registry import CLASSIFIER_NAME, resources
+from telemetry import telemetry
+
+_worker_engine = None
+
+
+def _init_worker(num_threads):
+    global _worker_engine
+    import torch
+    torch.set_num_threads(num_threads)
+    _worker_engine = resources.get("engine")
+
+
+def _run_micro_batch(pairs, batch_size):
+    return _worker_engine.probabilities(pairs, batch_size=batch_size)
+
+
+class InferencePool(InferenceEngine):
+    """Classifier spread over worker processes, each with its own model and thread budget.
+
+    Pairs are split into micro-batches that are queued to the workers and
+    merged back in input order, so the pool is a drop-in replacement for the
+    in-process engine.
+    """
+
+    def __init__(self, num_workers=None, threads_per_worker=None, micro_batch=64, batch_size=16):
+        cpus = os.cpu_count() or 1
+        self.num_workers = num_workers or max(1, cpus // 4)
+        self.threads_per_worker = threads_per_worker or max(1, cpus // self.num_workers)
+        self.micro_batch = micro_batch
+        self.batch_size = batch_size
+        self.max_length = 300
+        # Workers build their engine from POLCOMPASS_ENGINE, so name it the same way.
+        mode = os.environ.get("POLCOMPASS_ENGINE", "torch")
+        self.name = CLASSIFIER_NAME if mode == "torch" else f"{CLASSIFIER_NAME}:{mode}"
+        self.tokenizer = resources.get("tokenizer")
+        self.id2label = resources.get("config").id2label
+        self.projection = build_projection_matrix(self.id2label)
+        # spawn keeps workers from inheriting torch thread pools or loaded models.
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.num_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.threads_per_worker,),
+        )
+
+    def warm_up(self):
+        """Block until every worker has loaded its model."""
+        list(self._executor.map(_run_micro_batch, [[]] * self.num_workers, [None] * self.num_workers))
+
+    def probabilities(self, pairs, batch_size=None, encoded=None):
+        # Token IDs are not shipped to workers; they re-encode the (already packed) text.
+        if not pairs:
+            return np.zeros((0, len(self.id2label)), dtype=np.float32)
+        batch_size = batch_size or self.batch_size
+        chunks = [pairs[start:start + self.micro_batch] for start in range(0, len(pairs), self.micro_batch)]
+        with telemetry.span("classification", engine=self.name):
+            probs = np.vstack(list(self._executor.map(_run_micro_batch, chunks, [batch_size] * len(chunks))))
+        telemetry.count("classified_pairs", len(pairs))
+        telemetry.count("classifier_batches", len(chunks))
+        return probs
+
+    def close(self):
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,29 @@
+import numpy as np
+from constants import category_ideology_mapping
+
+
+def build_projection_matrix(id2label, mapping=category_ideology_mapping, scale=2):
+    """Compile the category mapping into a (num_labels, 2) econ/social matrix aligned with id2label."""
+    matrix = np.zeros((len(id2label), 2), dtype=np.float64)
+    for i, label in id2label.items():
+        # Labels missing from the mapping contribute nothing, like "000".
+        matrix[int(i)] = mapping.get(label, (0, 0))
+    return matrix * scale
+
+
+def top_k_mask(probs, top_k=None):
+    """Zero every probability outside each row's top_k classes."""
+    if top_k is None or top_k >= probs.shape[1]:
+        return probs
+    order = np.argsort(-probs, axis=1, kind="stable")[:, :top_k]
+    masked = np.zeros_like(probs)
+    np.put_along_axis(masked, order, np.take_along_axis(probs, order, axis=1), axis=1)
+    return masked
+
+
+def project(probs, matrix, top_k=None):
+    """Map an (N, num_labels) probability matrix to an (N, 2) array of econ/social points."""
+    probs = np.asarray(probs, dtype=np.float64)
+    if probs.ndim == 1:
+        probs = probs[np.newaxis, :]
+    return top_k_mask(probs, top_k) @ matrix
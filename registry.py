@@ -0,0 +1,167 @@
+import logging
+import os
+import threading
+import time
+import weakref
+
+from telemetry import telemetry
+
+logger = logging.getLogger(__name__)
+
+CLASSIFIER_NAME = "manifesto-project/manifestoberta-xlm-roberta-56policy-topics-context-2024-1-1"
+TOKENIZER_NAME = "xlm-roberta-large"
+
+
+class ResourceRegistry:
+    """Process-wide registry of expensive resources, each loaded once on first use.
+
+    Loaders are registered by name; ``get`` is thread-safe and every caller in
+    the process shares the same instance. spaCy pipelines are registered on
+    demand under ``spacy:<model name>``, or ``spacy:<model name>:<strategy>``
+    for a segmentation strategy other than the full parser.
+
+    A resource fetched by another resource's loader (the classifier inside the
+    engine's) is recorded as its dependency, so unloading it also unloads
+    everything built on it.
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._resources = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self._dependents = {}
+        self._loading = threading.local()
+        self.load_times = {}
+
+    def register(self, name, loader):
+        with self._lock:
+            self._loaders[name] = loader
+            self._locks.setdefault(name, threading.Lock())
+
+    def _lock_for(self, name):
+        with self._lock:
+            if name not in self._loaders and name.startswith("spacy:"):
+                language_model, _, strategy = name[len("spacy:"):].partition(":")
+                self._loaders[name] = lambda: _load_spacy(language_model, strategy or "parser")
+            if name not in self._loaders:
+                raise KeyError(f"No resource registered under {name!r}")
+            return self._locks.setdefault(name, threading.Lock())
+
+    def get(self, name):
+        stack = getattr(self._loading, "stack", None)
+        if stack:
+            with self._lock:
+                self._dependents.setdefault(name, set()).add(stack[-1])
+        if name in self._resources:
+            return self._resources[name]
+        with self._lock_for(name):
+            if name not in self._resources:
+                start = time.perf_counter()
+                if stack is None:
+                    stack = self._loading.stack = []
+                stack.append(name)
+                try:
+                    with telemetry.span("load", resource=name):
+                        self._resources[name] = self._loaders[name]()
+                finally:
+                    stack.pop()
+                self.load_times[name] = time.perf_counter() - start
+                logger.info("Loaded %s in %.2fs", name, self.load_times[name])
+        return self._resources[name]
+
+    def spacy(self, language_model, strategy="parser"):
+        if strategy == "parser":
+            return self.get(f"spacy:{language_model}")
+        return self.get(f"spacy:{language_model}:{strategy}")
+
+    def is_loaded(self, name):
+        return name in self._resources
+
+    def warm_up(self, *names):
+        """Load the given resources (or everything registered) ahead of the first request."""
+        for name in names or list(self._loaders):
+            self.get(name)
+        return dict(self.load_times)
+
+    def unload(self, *names):
+        """Drop the given resources (or all of them), and everything built on them, so they are reloaded on next use."""
+        with self._lock:
+            pending = list(names or self._resources)
+            dropped = []
+            while pending:
+                name = pending.pop()
+                if name not in dropped:
+                    dropped.append(name)
+                    pending.extend(self._dependents.get(name, ()))
+        # Dependents go first. Each name's own lock waits out a load in progress
+        # instead of letting it put the resource back afterwards.
+        for name in reversed(dropped):
+            if name not in self._locks:
+                continue
+            with self._lock_for(name):
+                self._resources.pop(name, None)
+                self.load_times.pop(name, None)
+
+
+def _load_classifier():
+    from transformers import AutoModelForSequenceClassification
+    return AutoModelForSequenceClassification.from_pretrained(CLASSIFIER_NAME, trust_remote_code=True)
+
+
+def _load_config():
+    from transformers import AutoConfig
+    return AutoConfig.from_pretrained(CLASSIFIER_NAME, trust_remote_code=True)
+
+
+def _load_tokenizer():
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(TOKENIZER_NAME)
+
+
+def _load_engine():
+    mode = os.environ.get("POLCOMPASS_ENGINE", "torch")
+    if mode == "torch":
+        from engine import InferenceEngine
+        return InferenceEngine(resources.get("classifier"), resources.get("tokenizer"))
+    from accelerated import load_engine
+    return load_engine(mode)
+
+
+_tokenizer_locks = weakref.WeakKeyDictionary()
+_tokenizer_locks_guard = threading.Lock()
+
+
+def tokenizer_lock(tokenizer):
+    """Lock that every thread using tokenizer must hold.
+
+    Hugging Face fast tokenizers are not thread-safe: calls with different
+    truncation or padding settings reconfigure the shared Rust tokenizer and
+    fail with "Already borrowed" when they overlap.
+    """
+    with _tokenizer_locks_guard:
+        lock = _tokenizer_locks.get(tokenizer)
+        if lock is None:
+            lock = _tokenizer_locks[tokenizer] = threading.RLock()
+        return lock
+
+
+def _load_cached_engine():
+    from classification_cache import CachedEngine, ClassificationCache
+    return CachedEngine(
+        resources.get("engine"),
+        ClassificationCache(path=os.environ.get("POLCOMPASS_CLASSIFICATION_CACHE")),
+    )
+
+
+def _load_spacy(language_model, strategy="parser"):
+    from segmentation import load_pipeline
+    return load_pipeline(language_model, strategy)
+
+
+resources = ResourceRegistry()
+resources.register("config", _load_config)
+resources.register("classifier", _load_classifier)
+resources.register("tokenizer", _load_tokenizer)
+resources.register("engine", _load_engine)
+resources.register("cached_engine", _load_cached_engine)
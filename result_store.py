@@ -0,0 +1,293 @@
+import json
+import os
+
+import numpy as np
+
+from median import batch_geometric_median
+
+QUADRANTS = ("AuthRight", "AuthLeft", "LibLeft", "LibRight")
+
+# name -> (dtype, per-row width, or None for the store's top_k)
+COLUMNS = {
+    "doc": (np.dtype("<i4"), 1),
+    "econ": (np.dtype("<f4"), 1),
+    "social": (np.dtype("<f4"), 1),
+    "codes": (np.dtype("<i2"), None),
+    "probs": (np.dtype("<f4"), None),
+    "text_end": (np.dtype("<i8"), 1),
+}
+
+
+def category_code(label):
+    """Numeric manifesto code of a label such as "411 - Technology and Infrastructure: Positive"; -1 if none."""
+    head = label.split(" ", 1)[0]
+    return int(head) if head.isdigit() else -1
+
+
+class ResultStore:
+    """Append-only columnar store of scored sentences and their documents.
+
+    Every sentence column is a raw little-endian file read back through
+    np.memmap: document index, econ and social scores, the top-k category
+    codes and probabilities, and the end offset of the sentence text in one
+    UTF-8 buffer. Documents (id plus metadata) are kept in documents.jsonl.
+    manifest.json records how many rows are committed, so bytes left behind
+    by an interrupted append are ignored and overwritten by the next one.
+
+    Queries run on whole columns at once: ``mask`` selects sentences by
+    document metadata, category prefix or quadrant; ``group_ids`` maps each
+    sentence to a group of documents; ``aggregate``, ``quadrant_counts``,
+    ``category_share`` and ``medians`` reduce per group.
+    """
+
+    def __init__(self, path, top_k=3):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._manifest_path = os.path.join(path, "manifest.json")
+        if os.path.exists(self._manifest_path):
+            with open(self._manifest_path) as f:
+                manifest = json.load(f)
+        else:
+            manifest = {"rows": 0, "documents": 0, "text_bytes": 0, "document_bytes": 0, "top_k": top_k}
+        self.rows = manifest["rows"]
+        self.num_documents = manifest["documents"]
+        self.text_bytes = manifest["text_bytes"]
+        self.document_bytes = manifest["document_bytes"]
+        self.top_k = manifest["top_k"]
+        self._documents = None
+        self._columns = {}
+
+    def _file(self, name):
+        return os.path.join(self.path, f"{name}.bin")
+
+    def _width(self, name):
+        width = COLUMNS[name][1]
+        return self.top_k if width is None else width
+
+    def _write_manifest(self):
+        tmp_path = self._manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "rows": self.rows,
+                "documents": self.num_documents,
+                "text_bytes": self.text_bytes,
+                "document_bytes": self.document_bytes,
+                "top_k": self.top_k,
+            }, f)
+        os.replace(tmp_path, self._manifest_path)
+
+    def _append_bytes(self, path, committed, data):
+        with open(path, "ab") as f:
+            f.truncate(committed)
+            f.write(data)
+
+    def add_document(self, doc_id, points, top_probs, sentences=None, metadata=None):
+        """Append one document's sentences.
+
+        points is (n, 2); top_probs holds per sentence the [(label, percent), ...]
+        list produced by InferenceEngine.top_k; sentences, if given, are the
+        texts. Rows are padded or cut to the store's top_k.
+        """
+        points = np.asarray(points, dtype=np.float32).reshape(-1, 2)
+        n = len(points)
+        codes = np.full((n, self.top_k), -1, dtype=np.int16)
+        probs = np.zeros((n, self.top_k), dtype=np.float32)
+        for i, row in enumerate(top_probs):
+            for j, (label, percent) in enumerate(row[:self.top_k]):
+                codes[i, j] = category_code(label)
+                probs[i, j] = percent / 100
+        encoded = [sentence.encode("utf-8") for sentence in (sentences or [""] * n)]
+        text_end = self.text_bytes + np.cumsum([len(text) for text in encoded], dtype=np.int64)
+
+        columns = {
+            "doc": np.full(n, self.num_documents, dtype=np.int32),
+            "econ": points[:, 0],
+            "social": points[:, 1],
+            "codes": codes,
+            "probs": probs,
+            "text_end": text_end,
+        }
+        for name, values in columns.items():
+            dtype = COLUMNS[name][0]
+            committed = self.rows * self._width(name) * dtype.itemsize
+            self._append_bytes(self._file(name), committed, np.ascontiguousarray(values, dtype=dtype).tobytes())
+        self._append_bytes(self._file("text"), self.text_bytes, b"".join(encoded))
+        record = {"doc_id": doc_id, **(metadata or {})}
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        self._append_bytes(self._documents_path, self.document_bytes, line)
+
+        documents = self.documents
+        self.rows += n
+        self.num_documents += 1
+        self.text_bytes = int(text_end[-1]) if n else self.text_bytes
+        self.document_bytes += len(line)
+        self._write_manifest()
+        documents.append(record)
+        self._columns.clear()
+
+    def add_analysis(self, doc_id, analysis, metadata=None):
+        """Append a CorpusAnalysis as one document."""
+        self.add_document(doc_id, analysis.points, analysis.probs, analysis.sentences, metadata)
+
+    def __len__(self):
+        return self.rows
+
+    def state(self):
+        """Committed row and document counts, to roll back to with truncate."""
+        return {"rows": self.rows, "documents": self.num_documents}
+
+    def truncate(self, rows, documents):
+        """Drop every row and document committed after the given counts."""
+        if rows > self.rows or documents > self.num_documents:
+            raise ValueError(f"Cannot truncate {self.rows} rows / {self.num_documents} documents to {rows} / {documents}")
+        text_bytes = int(self.column("text_end")[rows - 1]) if rows else 0
+        document_bytes = 0
+        if documents:
+            with open(self._documents_path, "rb") as f:
+                lines = f.read(self.document_bytes).splitlines(keepends=True)
+            document_bytes = sum(len(line) for line in lines[:documents])
+        self.rows, self.num_documents = rows, documents
+        self.text_bytes, self.document_bytes = text_bytes, document_bytes
+        self._write_manifest()
+        self._documents = None
+        self._columns.clear()
+
+    @property
+    def _documents_path(self):
+        return os.path.join(self.path, "documents.jsonl")
+
+    @property
+    def documents(self):
+        """Committed document records ({"doc_id", **metadata}), in the order they were added."""
+        if self._documents is None:
+            self._documents = []
+            if self.document_bytes:
+                with open(self._documents_path, "rb") as f:
+                    data = f.read(self.document_bytes).decode("utf-8")
+                self._documents = [json.loads(line) for line in data.splitlines() if line.strip()]
+        return self._documents
+
+    def column(self, name):
+        """Read-only memmap of a sentence column; (rows,) or (rows, top_k) for codes and probs."""
+        if name not in self._columns:
+            dtype, width = COLUMNS[name][0], self._width(name)
+            shape = (self.rows, width) if COLUMNS[name][1] is None else (self.rows,)
+            if self.rows == 0:
+                self._columns[name] = np.zeros(shape, dtype=dtype)
+            else:
+                self._columns[name] = np.memmap(self._file(name), dtype=dtype, mode="r", shape=shape)
+        return self._columns[name]
+
+    @property
+    def points(self):
+        return np.column_stack([self.column("econ"), self.column("social")])
+
+    def sentence(self, i):
+        end = int(self.column("text_end")[i])
+        start = int(self.column("text_end")[i - 1]) if i else 0
+        with open(self._file("text"), "rb") as f:
+            f.seek(start)
+            return f.read(end - start).decode("utf-8")
+
+    def document_values(self, key):
+        """One value per document: a metadata field name or a function of the document record."""
+        get = key if callable(key) else lambda document: document.get(key)
+        return [get(document) for document in self.documents]
+
+    def mask(self, where=None, category=None, quadrant=None):
+        """Boolean mask over sentences.
+
+        where is a function of the document record, category a code prefix
+        matched against the top category (e.g. "4" for 4xx, "411") and
+        quadrant one of QUADRANTS.
+        """
+        selected = np.ones(self.rows, dtype=bool)
+        if where is not None:
+            keep = np.array([bool(where(document)) for document in self.documents], dtype=bool)
+            selected &= keep[self.column("doc")] if len(keep) else selected
+        if category is not None:
+            top = self.column("codes")[:, 0].astype(np.int32)
+            selected &= (top >= 0) & (top // 10 ** (3 - len(category)) == int(category))
+        if quadrant is not None:
+            selected &= self.quadrants() == QUADRANTS.index(quadrant)
+        return selected
+
+    def quadrants(self):
+        """Per-sentence index into QUADRANTS, with the app's convention that 0 counts as positive."""
+        econ, social = self.column("econ"), self.column("social")
+        return np.select(
+            [(econ >= 0) & (social >= 0), (econ < 0) & (social >= 0), (econ < 0) & (social < 0)],
+            [0, 1, 2],
+            default=3,
+        )
+
+    def group_ids(self, by=None, mask=None):
+        """(group keys, per-sentence group index with -1 for masked-out rows)."""
+        if by is None:
+            keys, document_groups = [None], np.zeros(self.num_documents, dtype=np.int64)
+        else:
+            values = self.document_values(by)
+            index = {}
+            document_groups = np.array([index.setdefault(value, len(index)) for value in values], dtype=np.int64)
+            keys = list(index)
+        groups = document_groups[self.column("doc")] if self.rows else np.zeros(0, dtype=np.int64)
+        if mask is not None:
+            groups = np.where(mask, groups, -1)
+        return keys, groups
+
+    def aggregate(self, by=None, mask=None):
+        """{key: {"count", "mean_econ", "mean_social"}} per group."""
+        keys, groups = self.group_ids(by, mask)
+        kept = groups >= 0
+        counts = np.bincount(groups[kept], minlength=len(keys))
+        econ = np.bincount(groups[kept], weights=self.column("econ")[kept], minlength=len(keys))
+        social = np.bincount(groups[kept], weights=self.column("social")[kept], minlength=len(keys))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return {
+                key: {"count": int(counts[g]), "mean_econ": float(econ[g] / counts[g]), "mean_social": float(social[g] / counts[g])}
+                for g, key in enumerate(keys)
+            }
+
+    def quadrant_counts(self, by=None, mask=None):
+        """{key: {quadrant: count}} per group."""
+        keys, groups = self.group_ids(by, mask)
+        kept = groups >= 0
+        counts = np.bincount(groups[kept] * len(QUADRANTS) + self.quadrants()[kept], minlength=len(keys) * len(QUADRANTS))
+        counts = counts.reshape(len(keys), len(QUADRANTS))
+        return {key: dict(zip(QUADRANTS, counts[g].tolist())) for g, key in enumerate(keys)}
+
+    def category_share(self, category, by=None, mask=None):
+        """{key: share of sentences whose top category starts with the code prefix} per group."""
+        keys, groups = self.group_ids(by, mask)
+        kept = groups >= 0
+        total = np.bincount(groups[kept], minlength=len(keys))
+        hits = np.bincount(groups[kept & self.mask(category=category)], minlength=len(keys))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return {key: float(hits[g] / total[g]) for g, key in enumerate(keys)}
+
+    def medians(self, by=None, mask=None, eps=1e-5, max_cells=4_000_000):
+        """{key: (econ, social) geometric median} per group, solved in size-sorted batches.
+
+        Groups are batched so the padded (groups x points) problem stays under
+        max_cells; a group larger than that is solved on its own.
+        """
+        keys, groups = self.group_ids(by, mask)
+        kept = np.flatnonzero(groups >= 0)
+        order = kept[np.argsort(groups[kept], kind="stable")]
+        bounds = np.searchsorted(groups[order], np.arange(len(keys) + 1))
+        points = self.points
+        point_sets = [points[order[bounds[g]:bounds[g + 1]]] for g in range(len(keys))]
+
+        results = {}
+        by_size = sorted(range(len(keys)), key=lambda g: len(point_sets[g]))
+        start = 0
+        while start < len(by_size):
+            end = start + 1
+            while end < len(by_size) and (end - start + 1) * len(point_sets[by_size[end]]) <= max_cells:
+                end += 1
+            batch = by_size[start:end]
+            medians, _ = batch_geometric_median([point_sets[g] for g in batch], eps=eps)
+            for g, median in zip(batch, medians):
+                results[keys[g]] = None if np.isnan(median).any() else tuple(median.tolist())
+            start = end
+        return results
@@ -0,0 +1,141 @@
+"""Sentence segmentation strategies and a benchmark against the full parser.
+
+Usage:
+    python segmentation.py
+    python segmentation.py speeches/*.txt --n-process 4
+
+Strategies:
+    parser       the full pipeline, reading doc.sents from the dependency parse
+    senter       the statistical sentence recognizer alone, parser and the rest disabled
+    sentencizer  spaCy's rule-based, punctuation-driven splitter on a blank pipeline
+"""
+import argparse
+import re
+import time
+
+STRATEGIES = ("parser", "senter", "sentencizer")
+
+
+def load_pipeline(language_model="en_core_web_sm", strategy="parser"):
+    import spacy
+
+    if strategy == "parser":
+        return spacy.load(language_model)
+    if strategy == "senter":
+        nlp = spacy.load(language_model, exclude=["parser"])
+        nlp.enable_pipe("senter")
+        enable = ["senter"]
+        # Keep the shared tok2vec only if senter actually listens to it.
+        if "tok2vec" in nlp.pipe_names and "senter" in nlp.get_pipe("tok2vec").listening_components:
+            enable.insert(0, "tok2vec")
+        nlp.select_pipes(enable=enable)
+        return nlp
+    if strategy == "sentencizer":
+        nlp = spacy.blank(language_model.split("_", 1)[0])
+        nlp.add_pipe("sentencizer")
+        return nlp
+    raise ValueError(f"Unknown segmentation strategy {strategy!r}; expected one of {', '.join(STRATEGIES)}")
+
+
+def split_paragraphs(text, chunk_chars=100_000):
+    """Split text at blank lines into chunks of roughly chunk_chars characters."""
+    chunks, current, size = [], [], 0
+    for paragraph in re.split(r"(\n\s*\n)", text):
+        current.append(paragraph)
+        size += len(paragraph)
+        if size >= chunk_chars and not paragraph.strip():
+            chunks.append("".join(current))
+            current, size = [], 0
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+
+def split_sentences(nlp, text, n_process=1, chunk_chars=100_000):
+    """Stripped sentences of text, as Segmenter has always produced them.
+
+    Inputs longer than chunk_chars are cut at blank lines and segmented with
+    nlp.pipe across n_process processes.
+    """
+    if n_process == 1 or len(text) <= chunk_chars:
+        docs = [nlp(text)]
+    else:
+        docs = nlp.pipe(split_paragraphs(text, chunk_chars), n_process=n_process)
+    return [sent.text.strip() for doc in docs for sent in doc.sents]
+
+
+def _boundaries(sentences):
+    # Sentence ends as offsets into the whitespace-free text, so strategies that
+    # attach whitespace differently still line up.
+    ends, offset = set(), 0
+    for sentence in sentences:
+        offset += len("".join(sentence.split()))
+        ends.add(offset)
+    return ends
+
+
+def boundary_agreement(reference, candidate):
+    """Precision, recall and F1 of candidate sentence boundaries against reference."""
+    reference_ends, candidate_ends = _boundaries(reference), _boundaries(candidate)
+    matched = len(reference_ends & candidate_ends)
+    precision = matched / len(candidate_ends) if candidate_ends else 1.0
+    recall = matched / len(reference_ends) if reference_ends else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {"precision": precision, "recall": recall, "f1": f1}
+
+
+def compare_strategies(texts, language_model="en_core_web_sm", n_process=1, repeats=3):
+    """Time every strategy over texts and score its boundaries against the parser's."""
+    results, reference = {}, None
+    for strategy in STRATEGIES:
+        nlp = load_pipeline(language_model, strategy)
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            sentences = [split_sentences(nlp, text, n_process=n_process) for text in texts]
+            timings.append(time.perf_counter() - start)
+        seconds = min(timings)
+        if reference is None:
+            reference = sentences
+        agreement = [boundary_agreement(ref, cand) for ref, cand in zip(reference, sentences)]
+        results[strategy] = {
+            "sentences": sum(len(doc_sentences) for doc_sentences in sentences),
+            "seconds": seconds,
+            "chars_per_second": sum(len(text) for text in texts) / seconds if seconds else float("inf"),
+            "speedup": results.get("parser", {"seconds": seconds})["seconds"] / seconds if seconds else float("inf"),
+            **{
+                key: sum(scores[key] for scores in agreement) / len(agreement)
+                for key in ("precision", "recall", "f1")
+            },
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare sentence segmentation strategies against the full parser.")
+    parser.add_argument("files", nargs="*", help="Text files to segment (default: the test.py speeches)")
+    parser.add_argument("--language-model", default="en_core_web_sm")
+    parser.add_argument("--n-process", type=int, default=1)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.files:
+        texts = []
+        for path in args.files:
+            with open(path, encoding="utf-8") as f:
+                texts.append(f.read())
+    else:
+        from test import political_sentences, political_sentences_m
+        texts = [" ".join(political_sentences), " ".join(political_sentences_m)]
+
+    results = compare_strategies(texts, args.language_model, n_process=args.n_process, repeats=args.repeats)
+    for strategy, report in results.items():
+        print(
+            f"{strategy:<12} {report['sentences']:>7} sentences  {report['seconds']:8.3f}s  "
+            f"{report['chars_per_second']:12.0f} chars/s  x{report['speedup']:.1f}  "
+            f"P {report['precision']:.3f}  R {report['recall']:.3f}  F1 {report['f1']:.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,81 +1,357 @@
-import spacy
-import torch
-from transformers import AutoModelForSequenceClassification, AutoTokenizer
-from constants import category_ideology_mapping
-from openai import AsyncOpenAI
 import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-import seaborn as sns
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
 import asyncio
+import functools
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from difflib import SequenceMatcher
 from dotenv import load_dotenv
+from compass import get_renderer
+from corpus import LazySequence, Ragged, SentenceBuffer, take
+from embeddings import EmbeddingBackend, LocalEmbeddingBackend, OpenAIEmbeddingBackend
+from neighbors import iter_context_neighbors, join_context, join_ids, normalize
+from segmentation import split_sentences
+from streaming import iter_sentences, iter_text_chunks
+from median import batch_geometric_median, geometric_median
+from registry import resources
+from telemetry import telemetry
 
 
-model = AutoModelForSequenceClassification.from_pretrained("manifesto-project/manifestoberta-xlm-roberta-56policy-topics-context-2024-1-1", trust_remote_code=True)
-tokenizer = AutoTokenizer.from_pretrained("xlm-roberta-large")
+EMBEDDING_MODEL = "text-embedding-3-small"
+# Roughly the 300 characters the character budget allows, at ~4 characters per token.
+CONTEXT_TOKENS = 75
+
+
+def _similarity_contexts(sentences, neighbors):
+    """self.context rows built on access from the sentence buffer and neighbor indices."""
+    return LazySequence(len(sentences), lambda i: {
+        'sentence': sentences[i],
+        'similarity_context': join_context(neighbors[i], sentences),
+    })
+
+
+def _context_strings(context):
+    return LazySequence(len(context), lambda i: Segmenter._context_of(context[i]))
+
+
+def _context_pairs(context):
+    return LazySequence(len(context), lambda i: (context[i].get('sentence'), Segmenter._context_of(context[i])))
+
+
+def _encoded_ids(token_ids, neighbors, rows):
+    # The ID lists are joined from the neighbor arrays only when the engine reads them.
+    if token_ids is None:
+        return None
+    return take(LazySequence(len(token_ids), lambda i: (token_ids[i].tolist(), join_ids(neighbors[i], token_ids))), rows)
+
+
+class CorpusAnalysis:
+    """Per-sentence probabilities and points for a corpus, plus their geometric median."""
+
+    def __init__(self, sentences, contexts, probs, points, median):
+        self.sentences = sentences
+        self.contexts = contexts
+        self.probs = probs
+        self.points = points
+        self.median = median
+
+    def __len__(self):
+        return len(self.sentences)
+
+    def __iter__(self):
+        """Yield (sentence, econ_score, social_score, probs) per sentence."""
+        for sentence, (econ_score, social_score), probs in zip(self.sentences, self.points.tolist(), self.probs):
+            yield sentence, econ_score, social_score, probs
+
 
 class Segmenter:
-    def __init__(self, corpus, language_model="en_core_web_sm"):
+    def __init__(self, corpus=None, language_model="en_core_web_sm", embedding_cache=None, embedding_backend="openai", client=None, max_concurrency=4, approximate_neighbors=False, engine=None, context_budget="tokens", context_tokens=CONTEXT_TOKENS, segmentation="parser", n_process=1, cascade=None):
+        if context_budget not in ("tokens", "chars"):
+            raise ValueError(f"Unknown context budget: {context_budget!r}")
         self.corpus = corpus
-        self.nlp = spacy.load(language_model)
-        self.client = AsyncOpenAI()
+        self._engine = engine
+        self.context_budget = context_budget
+        self.context_tokens = context_tokens
+        self._token_ids = None
+        self.approximate_neighbors = approximate_neighbors
+        self.embedding_backend = Segmenter._resolve_embedding_backend(embedding_backend, client, max_concurrency)
+        if embedding_cache is not None and embedding_cache.dim != self.embedding_backend.dim:
+            raise ValueError(
+                f"Embedding cache holds {embedding_cache.dim}-d vectors but "
+                f"{self.embedding_backend.name} produces {self.embedding_backend.dim}-d vectors"
+            )
+        self.embedding_cache = embedding_cache
+        if cascade is not None and cascade.embedding_model != self.embedding_backend.name:
+            raise ValueError(
+                f"Cascade probe was trained on {cascade.embedding_model} embeddings, "
+                f"not {self.embedding_backend.name}"
+            )
+        self.cascade = cascade
+        self.n_process = n_process
+        self.nlp = resources.spacy(language_model, segmentation)
         self._load_sentences()
+
+    @property
+    def sentences(self):
+        """Sentences of the corpus, kept as one text buffer with end offsets."""
+        return self._sentences
+
+    @sentences.setter
+    def sentences(self, sentences):
+        self._sentences = sentences if isinstance(sentences, SentenceBuffer) else SentenceBuffer(sentences)
        
+    @property
+    def engine(self):
+        """Classifier used by this instance: an injected engine or pool, else the shared one."""
+        return self._engine or resources.get("cached_engine")
+
+    @classmethod
+    def _resolve_embedding_backend(cls, embedding_backend, client=None, max_concurrency=4):
+        if isinstance(embedding_backend, EmbeddingBackend):
+            return embedding_backend
+        if embedding_backend == "openai":
+            return OpenAIEmbeddingBackend(client=client, model=EMBEDDING_MODEL, max_concurrency=max_concurrency)
+        if embedding_backend == "local":
+            return LocalEmbeddingBackend(resources.get("classifier"), resources.get("tokenizer"))
+        raise ValueError(f"Unknown embedding backend: {embedding_backend!r}")
         
     async def initialize(self):
-        await self._calculate_openai_embeddings()
+        await self._calculate_embeddings()
         self._construct_similarity_context()
 
+    async def _calculate_embeddings(self):
+        self.sentence_embeddings = await self._embed_sentences(self.sentences)
+
+    async def _embed_sentences(self, sentences):
+        with telemetry.span("embedding", backend=self.embedding_backend.name):
+            backend = self.embedding_backend
+            if self.embedding_cache is not None:
+                cached = self.embedding_cache.get_many(backend.name, sentences)
+            else:
+                cached = [None] * len(sentences)
+
+            # Only sentences missing from the cache go to the API, each one once.
+            misses = list(dict.fromkeys(
+                sentence for sentence, vector in zip(sentences, cached) if vector is None
+            ))
+            telemetry.count("embedding_cache_hits", len(sentences) - sum(vector is None for vector in cached))
+            telemetry.count("embedding_cache_misses", len(misses))
+            results = await backend.embed(misses) if misses else np.zeros((0, backend.dim), dtype=np.float32)
+            if self.embedding_cache is not None and misses:
+                self.embedding_cache.put_many(backend.name, misses, results)
+
+            fetched = dict(zip(misses, results))
+            embeddings = np.zeros((len(sentences), backend.dim), dtype=np.float32)
+            for i, (sentence, vector) in enumerate(zip(sentences, cached)):
+                embeddings[i] = vector if vector is not None else fetched[sentence]
+            return embeddings
+
     async def _calculate_openai_embeddings(self):
-        self.sentence_embeddings = []
-        tasks = [
-            self._fetch_embedding(sentence) for sentence in self.sentences
-        ]
-        results = await asyncio.gather(*tasks)
-        self.sentence_embeddings.extend(results)
+        await self._calculate_embeddings()
 
     async def _fetch_embedding(self, sentence):
         """Helper function to fetch embedding for a single sentence."""
-        response = await self.client.embeddings.create(
-            model="text-embedding-3-small",
-            input=sentence
-        )
-        return response.data[0].embedding
+        results = await self.embedding_backend.embed([sentence])
+        return results[0]
+
+    def _packing(self, sentences):
+        """Per-sentence lengths, the budget they share and token IDs (None when packing by characters).
+
+        With context_budget="tokens" each sentence is tokenized once through the
+        engine's token cache and neighbors are packed until the sentence and its
+        context use context_tokens tokens, capped at what fits in the
+        classifier's max_length.
+        """
+        if self.context_budget == "chars":
+            return None, 300, None
+        engine = self.engine
+        token_ids = engine.token_cache.get_many(sentences)
+        return [len(ids) for ids in token_ids], min(self.context_tokens, engine.context_budget), token_ids
+
+    def _encoded(self, rows):
+        """(sentence IDs, context IDs) for rows, or None when context was not packed by tokens."""
+        return _encoded_ids(self._token_ids, self._neighbors, rows)
+
+    def _contexts(self):
+        """Context string per row of self.context, built on access."""
+        return _context_strings(self.context)
+
+    def _classification_inputs(self):
+        """(sentence, context) pairs for every row of self.context, plus their token IDs if available.
+
+        Both are lazy, so the engine builds them one batch window at a time.
+        """
+        return _context_pairs(self.context), self._encoded(range(len(self.context)))
+
+    def _classify(self, pairs, embeddings, batch_size=None, encoded=None):
+        """Probabilities for pairs, letting the cascade probe (if any) answer the confidently neutral ones."""
+        if self.cascade is None:
+            return self.engine.probabilities(pairs, batch_size=batch_size, encoded=encoded)
+        if embeddings is None:
+            raise ValueError("The cascade probe needs sentence embeddings; call initialize() before analyze()")
+        return self.cascade.probabilities(self.engine, pairs, embeddings, batch_size=batch_size, encoded=encoded)
 
     def _construct_similarity_context(self):
         """Construct context by finding closest sentences in embedding space."""
-        similarity_context_data = []
-        num_sentences = len(self.sentences)
-
-        # Compute cosine similarity matrix
-        similarity_matrix = cosine_similarity(self.sentence_embeddings)
+        neighbors = [None] * len(self.sentences)
+        self._cutoffs = np.full(len(self.sentences), -np.inf)
+        self._slack = np.zeros(len(self.sentences))
+        with telemetry.span("similarity_context"):
+            lengths, budget, token_ids = self._packing(self.sentences)
+            for i, used, cutoff, slack in iter_context_neighbors(
+                self.sentences,
+                self.sentence_embeddings,
+                budget=budget,
+                approximate=self.approximate_neighbors,
+                lengths=lengths,
+            ):
+                neighbors[i] = used
+                self._cutoffs[i] = cutoff
+                self._slack[i] = slack
+        self._set_neighbors(neighbors, token_ids)
 
-        for i, sentence in enumerate(self.sentences):
-            # Find indices of sentences closest to the current sentence
-            similar_indices = similarity_matrix[i].argsort()[::-1]  # Sort by similarity descending
-            context = ""
-            char_count = len(sentence)
-            
-            for j in similar_indices:
-                if i == j or char_count + len(self.sentences[j]) > 300:
-                    continue
-                context += self.sentences[j] + " "
-                char_count += len(self.sentences[j])
-                if char_count >= 300:
-                    break
-            
-            similarity_context_data.append({
-                'sentence': sentence,
-                'similarity_context': context.strip()
-            })
-        
-        self.context = similarity_context_data
+    def _set_neighbors(self, neighbors, token_ids):
+        """Keep neighbor lists and token IDs as flat arrays; context strings are joined only when read."""
+        self._neighbors = Ragged.from_lists(neighbors)
+        self._token_ids = None if token_ids is None else Ragged.from_lists(token_ids)
+        self.context = _similarity_contexts(self.sentences, self._neighbors)
         
     def _load_sentences(self):
-        doc = self.nlp(self.corpus)
-        self.sentences = [sent.text.strip() for sent in doc.sents]
+        self.sentences = self._split(self.corpus)
         #self.filter_sentences()
+
+    def _split(self, corpus):
+        if corpus is None:
+            return []
+        with telemetry.span("segmentation"):
+            sentences = split_sentences(self.nlp, corpus, n_process=self.n_process)
+        telemetry.count("sentences", len(sentences))
+        return sentences
+
+    async def stream(self, source, window=256, batch_size=64, top_k=3):
+        """Score a file path or iterable of text chunks incrementally.
+
+        Sentences are segmented with nlp.pipe and scored batch_size at a time;
+        each batch draws its similarity context from itself and the previous
+        window sentences only, so memory stays bounded. Yields
+        (sentence, econ_score, social_score, probs) tuples in document order.
+        """
+        history = deque(maxlen=window)
+        batch = []
+        for sentence in iter_sentences(self.nlp, iter_text_chunks(source), n_process=self.n_process):
+            batch.append(sentence)
+            if len(batch) == batch_size:
+                for row in await self._score_window(batch, history, top_k):
+                    yield row
+                batch = []
+        if batch:
+            for row in await self._score_window(batch, history, top_k):
+                yield row
+
+    async def pipeline(self, source, window=256, batch_size=64, top_k=3, max_pending=4, executor=None):
+        """Like stream, but with segmentation, embedding, context and classification overlapped.
+
+        Batches move through bounded asyncio queues. Segmentation runs in the
+        default executor. Up to max_pending embedding requests are in flight
+        while earlier batches get their context. Classification runs on
+        executor, by default a dedicated single thread, while the next batch's
+        context is built. Global neighbor search would need every embedding
+        before the first classification, so context is windowed exactly as in
+        stream and the output matches it. Yields the same tuples in document
+        order.
+        """
+        loop = asyncio.get_running_loop()
+        own_executor = executor is None
+        executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="polcompass-model")
+        embedded = asyncio.Queue(max_pending)
+        classified = asyncio.Queue(max_pending)
+        sentences = iter_sentences(self.nlp, iter_text_chunks(source), n_process=self.n_process)
+
+        async def segment_and_embed():
+            try:
+                while True:
+                    batch = await loop.run_in_executor(None, lambda: list(itertools.islice(sentences, batch_size)))
+                    if not batch:
+                        break
+                    await embedded.put((batch, asyncio.ensure_future(self._embed_sentences(batch))))
+            finally:
+                await embedded.put(None)
+
+        async def contextualize_and_classify():
+            history = deque(maxlen=window)
+            try:
+                while (item := await embedded.get()) is not None:
+                    batch, embedding = item
+                    embeddings = await embedding
+                    pairs, encoded = await loop.run_in_executor(None, self._window_pairs, batch, embeddings, history)
+                    future = loop.run_in_executor(
+                        executor,
+                        functools.partial(self._classify, pairs, embeddings, encoded=encoded),
+                    )
+                    await classified.put((batch, future))
+            finally:
+                await classified.put(None)
+
+        stages = [asyncio.ensure_future(segment_and_embed()), asyncio.ensure_future(contextualize_and_classify())]
+        try:
+            while (item := await classified.get()) is not None:
+                batch, future = item
+                for row in self._window_rows(batch, await future, top_k):
+                    yield row
+            # Downstream first: a failed stage stops consuming, which can leave
+            # the one before it blocked on a full queue.
+            for stage in reversed(stages):
+                await stage
+        finally:
+            for stage in stages:
+                stage.cancel()
+            for queue in (embedded, classified):
+                while not queue.empty():
+                    item = queue.get_nowait()
+                    if item is not None:
+                        item[1].cancel()
+            if own_executor:
+                executor.shutdown(wait=False)
+
+    async def _score_window(self, batch, history, top_k=3):
+        embeddings = await self._embed_sentences(batch)
+        pairs, encoded = self._window_pairs(batch, embeddings, history)
+        return self._window_rows(batch, self._classify(pairs, embeddings, encoded=encoded), top_k)
+
+    def _window_pairs(self, batch, embeddings, history):
+        """(sentence, context) pairs and token IDs for batch, with context from batch plus history; extends history."""
+        sentences = [sentence for sentence, _ in history] + batch
+        pool = np.vstack([vector for _, vector in history] + [embeddings])
+        lengths, budget, token_ids = self._packing(sentences)
+        neighbors = [
+            used
+            for _, used, _, _ in iter_context_neighbors(
+                sentences,
+                pool,
+                rows=np.arange(len(history), len(sentences)),
+                budget=budget,
+                approximate=self.approximate_neighbors,
+                lengths=lengths,
+            )
+        ]
+        contexts = [join_context(used, sentences) for used in neighbors]
+        encoded = None
+        if token_ids is not None:
+            encoded = [
+                (token_ids[len(history) + i], join_ids(used, token_ids))
+                for i, used in enumerate(neighbors)
+            ]
+        history.extend(zip(batch, embeddings))
+        return list(zip(batch, contexts)), encoded
+
+    def _window_rows(self, batch, probs, top_k=3):
+        engine = self.engine
+        points = engine.project(probs, top_k=top_k).tolist()
+        return [
+            (sentence, econ_score, social_score, top_probs)
+            for sentence, (econ_score, social_score), top_probs in zip(batch, points, engine.top_k(probs, top_k=top_k))
+        ]
              
     def _construct_greedy_context(self):
         greedy_context_data = []
@@ -110,83 +386,204 @@ class Segmenter:
             })
             
         self.context = greedy_context_data   
+        self._neighbors = None
+        self._token_ids = None
     
     @classmethod
     def _infer(cls, sentence, context, top_k=3):
-        inputs = tokenizer(sentence, context, return_tensors="pt", max_length=300, padding="max_length", truncation=True)
-        logits = model(**inputs).logits
-        probabilities = torch.softmax(logits, dim=1).tolist()[0]
-        class_probs = {model.config.id2label[i]: probabilities[i]*100 for i in range(len(probabilities))}
-        class_probs = dict(sorted(class_probs.items(), key=lambda item: item[1], reverse=True))
-        return list(class_probs.items())[:top_k]
-    
+        return Segmenter._infer_batch([(sentence, context)], top_k=top_k)[0]
+
+    @classmethod
+    def _infer_batch(cls, pairs, top_k=3, batch_size=None):
+        engine = resources.get("cached_engine")
+        return engine.classify(pairs, top_k=top_k, batch_size=batch_size)
+
+    @classmethod
+    def _embed_batch(cls, pairs, top_k=3, batch_size=None):
+        engine = resources.get("cached_engine")
+        probs = engine.probabilities(pairs, batch_size=batch_size)
+        points = engine.project(probs, top_k=top_k)
+        return [
+            (econ_score, social_score, top_probs)
+            for (econ_score, social_score), top_probs in zip(points.tolist(), engine.top_k(probs, top_k=top_k))
+        ]
+
     @classmethod    
     def _embed(cls, sentence, context, top_k=3):
-        probs = Segmenter._infer(
-            sentence=sentence,
-            context=context,
-            top_k=top_k
-        )
-        econ_score_total, social_score_total = 0, 0
-        for cat, prob in probs:
-            econ_score, soc_score = category_ideology_mapping[cat] 
-            
-            econ_score_total += (econ_score *2) * (prob / 100)
-            social_score_total += (soc_score *2) * (prob / 100)
-        return econ_score_total, social_score_total, probs
+        return Segmenter._embed_batch([(sentence, context)], top_k=top_k)[0]
     
     
     @classmethod    
     def _embed_no_probs(cls, sentence, context, top_k=3):
-        probs = Segmenter._infer(
+        econ_score_total, social_score_total, _ = Segmenter._embed(
             sentence=sentence,
             context=context,
             top_k=top_k
         )
-        econ_score_total, social_score_total = 0, 0
-        for cat, prob in probs:
-            econ_score, soc_score = category_ideology_mapping[cat] 
-            
-            econ_score_total += (econ_score *2) * (prob / 100)
-            social_score_total += (soc_score *2) * (prob / 100)
         return econ_score_total, social_score_total
     
     
     
-    def _embed_corpus(self, top_k=3):
-        self.points = ([
-            Segmenter._embed_no_probs(
-                sentence=datum.get('sentence'),
-                context=datum.get('greedy_context'),
-                top_k=top_k
-            )
-            for datum in self.context
-        ])
-        
-        return Segmenter.geometric_median(
-            np.array(self.points)
+    @classmethod
+    def _context_of(cls, datum):
+        return datum.get('similarity_context', datum.get('greedy_context'))
+
+    def analyze(self, top_k=3, batch_size=None):
+        """Classify every sentence once and keep the result on self.analysis."""
+        pairs, encoded = self._classification_inputs()
+        probs = self._classify(pairs, getattr(self, "sentence_embeddings", None), batch_size=batch_size, encoded=encoded)
+        return self._set_analysis(self.sentences, self._contexts(), probs, top_k)
+
+    def _set_analysis(self, sentences, contexts, probs, top_k=3, init=None):
+        engine = self.engine
+        with telemetry.span("projection"):
+            points = engine.project(probs, top_k=top_k)
+        with telemetry.span("geometric_median"):
+            median = Segmenter.geometric_median(points, init=init) if len(points) else None
+
+        self._probs = probs
+        self.points = points.tolist()
+        self.analysis = CorpusAnalysis(
+            sentences=sentences,
+            contexts=contexts,
+            probs=engine.top_k(probs, top_k=top_k),
+            points=points,
+            median=median,
         )
+        return self.analysis
+
+    async def update(self, corpus, top_k=3, batch_size=None):
+        """Re-analyze an edited corpus, redoing only the work the edit invalidated.
+
+        Sentences are diffed against the previous corpus. Only new sentences are
+        embedded; a kept sentence gets new similarity context only if a removed
+        sentence was part of it or a new sentence is at least as similar as the
+        neighbor that filled its budget; and only pairs whose (sentence, context)
+        changed are re-classified. The median solve starts from the old median.
+        """
+        if getattr(self, "_probs", None) is None or getattr(self, "_neighbors", None) is None:
+            try:
+                self.corpus = corpus
+                self._load_sentences()
+                await self.initialize()
+                return self.analyze(top_k=top_k, batch_size=batch_size)
+            except BaseException:
+                # Leave no half-built state for the next update to diff against.
+                self._probs = None
+                raise
+
+        # Everything is computed in locals and assigned at the end, so a failure
+        # (e.g. the embedding API giving up) leaves the previous analysis intact.
+        old_sentences = self.sentences
+        old_embeddings = self.sentence_embeddings
+        old_contexts = self.analysis.contexts
+        old_neighbors, old_cutoffs, old_slack, old_probs = self._neighbors, self._cutoffs, self._slack, self._probs
+        old_median = self.analysis.median
+
+        sentences = SentenceBuffer(self._split(corpus))
+        n = len(sentences)
+
+        old_of_new = np.full(n, -1)
+        matcher = SequenceMatcher(None, list(old_sentences), list(sentences), autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == 'equal':
+                old_of_new[j1:j2] = np.arange(i1, i2)
+        kept = old_of_new >= 0
+        added = np.flatnonzero(~kept)
+        new_of_old = np.full(len(old_sentences), -1)
+        new_of_old[old_of_new[kept]] = np.flatnonzero(kept)
+
+        embeddings = np.zeros((n, old_embeddings.shape[1]), dtype=np.float32)
+        embeddings[kept] = old_embeddings[old_of_new[kept]]
+        if len(added):
+            embeddings[added] = await self._embed_sentences([sentences[i] for i in added])
+
+        # Best similarity of each kept sentence to any new one.
+        normalized = normalize(embeddings)
+        best_added = np.full(n, -np.inf)
+        if len(added):
+            kept_rows = np.flatnonzero(kept)
+            for start in range(0, len(kept_rows), 1024):
+                block = kept_rows[start:start + 1024]
+                best_added[block] = (normalized[block] @ normalized[added].T).max(axis=1)
+
+        # A kept row's packing can change only if a new sentence ranks above its
+        # last neighbor, a new sentence fits in its leftover budget, or one of
+        # its neighbors was removed.
+        lengths, budget, token_ids = self._packing(sentences)
+        sizes = np.array([len(sentence) for sentence in sentences] if lengths is None else lengths)
+        shortest_added = sizes[added].min() if len(added) else np.inf
+        removed = new_of_old < 0
+        neighbors = [None] * n
+        cutoffs = np.full(n, -np.inf)
+        slacks = np.zeros(n)
+        stale = []
+        for i in range(n):
+            o = old_of_new[i]
+            if o < 0 or best_added[i] >= old_cutoffs[o] or shortest_added <= old_slack[o] or removed[old_neighbors[o]].any():
+                stale.append(i)
+            else:
+                neighbors[i] = new_of_old[old_neighbors[o]]
+                cutoffs[i] = old_cutoffs[o]
+                slacks[i] = old_slack[o]
+        telemetry.count("context_repacked", len(stale))
+        for i, used, cutoff, slack in iter_context_neighbors(
+            sentences,
+            embeddings,
+            rows=stale,
+            budget=budget,
+            approximate=self.approximate_neighbors,
+            lengths=lengths,
+        ):
+            neighbors[i] = used
+            cutoffs[i] = cutoff
+            slacks[i] = slack
+        neighbors = Ragged.from_lists(neighbors)
+        token_ids = None if token_ids is None else Ragged.from_lists(token_ids)
+        context = _similarity_contexts(sentences, neighbors)
+        contexts = _context_strings(context)
+
+        probs = np.zeros((n, old_probs.shape[1]), dtype=np.float32)
+        changed = []
+        for i in range(n):
+            o = old_of_new[i]
+            if o >= 0 and contexts[i] == old_contexts[o]:
+                probs[i] = old_probs[o]
+            else:
+                changed.append(i)
+        if changed:
+            probs[changed] = self._classify(
+                take(_context_pairs(context), changed),
+                embeddings[changed],
+                batch_size=batch_size,
+                encoded=_encoded_ids(token_ids, neighbors, changed),
+            )
+
+        self.corpus = corpus
+        self.sentences = sentences
+        self.sentence_embeddings = embeddings
+        self._cutoffs, self._slack = cutoffs, slacks
+        self._neighbors, self._token_ids, self.context = neighbors, token_ids, context
+        return self._set_analysis(self.sentences, contexts, probs, top_k, init=old_median)
+
+    def _embed_corpus(self, top_k=3, batch_size=None):
+        return self.analyze(top_k=top_k, batch_size=batch_size).median
          
     @classmethod
-    def geometric_median(cls, X, eps=1e-5):
-        y = np.mean(X, axis=0)
-        while True:
-            D = np.sqrt(((X - y)**2).sum(axis=1))
-            nonzeros = (D != 0)
-            if not np.any(nonzeros):
-                return y
-            w = 1 / D[nonzeros]
-            T = (X[nonzeros] * w[:, np.newaxis]).sum(axis=0) / w.sum()
-            
-            if np.linalg.norm(y - T) < eps:
-                return T
-            y = T
+    def geometric_median(cls, X, eps=1e-5, init=None, weights=None, max_iter=1000, return_info=False):
+        median, info = geometric_median(X, weights=weights, init=init, eps=eps, max_iter=max_iter)
+        return (median, info) if return_info else median
+
+    @classmethod
+    def batch_geometric_median(cls, point_sets, eps=1e-5, init=None, weights=None, max_iter=1000):
+        """Medians of many ragged point sets in one vectorized solve; returns (medians, info)."""
+        return batch_geometric_median(point_sets, weights=weights, init=init, eps=eps, max_iter=max_iter)
         
     def plot_sentence(self, at_index=0):
         Segmenter._plot(
             Segmenter._embed(
                 sentence=self.context[at_index].get('sentence'),
-                context=self.context[at_index].get('greedy_context'),
+                context=Segmenter._context_of(self.context[at_index]),
                 top_k=3
             )
         )
@@ -201,51 +598,12 @@ class Segmenter:
     
     @classmethod
     def _plot(cls, points, median_point=None):
+        if not isinstance(points, (list, np.ndarray)):
+            # A single (econ, social, probs) result from _embed.
+            points = [points[:2]]
         plt.figure(figsize=(10, 10))
-        plt.style.use('ggplot')  # Switched from 'seaborn' to 'ggplot' for a change of scenery
-        # Custom color palette
-        quadrant_colors = {
-            'top_left': '#FFB3BA',      # Soft Pink (Liberal)
-            'top_right': '#BAFFC9',     # Soft Green (Libertarian)
-            'bottom_left': '#BAE1FF',   # Soft Blue (Socialist)
-            'bottom_right': '#FFE9BA'   # Soft Yellow (Conservative)
-        }
-
-        # Fill quadrants with colors
-        plt.axhline(y=0, color='gray', linestyle='--', linewidth=0.5)
-        plt.axvline(x=0, color='gray', linestyle='--', linewidth=0.5)
-        
-        plt.fill_between([-10, 0], 0, 10, color=quadrant_colors['top_left'], alpha=0.3)
-        plt.fill_between([0, 10], 0, 10, color=quadrant_colors['top_right'], alpha=0.3)
-        plt.fill_between([-10, 0], -10, 0, color=quadrant_colors['bottom_left'], alpha=0.3)
-        plt.fill_between([0, 10], -10, 0, color=quadrant_colors['bottom_right'], alpha=0.3)
-
-        # Add labels to quadrants
-        plt.text(-5, 9, 'AuthLeft', horizontalalignment='center', fontsize=10)
-        plt.text(5, 9, 'AuthRight', horizontalalignment='center', fontsize=10)
-        plt.text(-5, -1, 'LibLeft', horizontalalignment='center', fontsize=10)
-        plt.text(5, -1, 'LibRight', horizontalalignment='center', fontsize=10)
-
-        # Plot individual points
-        if isinstance(points, list):
-            econ_points = [point[0] for point in points]
-            social_points = [point[1] for point in points]
-            plt.scatter(econ_points, social_points, c='blue', alpha=0.6, edgecolors='black', linewidth=0.5)
-        else:
-            plt.scatter(points[0], points[1], c='blue', alpha=0.6, edgecolors='black', linewidth=0.5)
-
-        # Plot geometric median
-        if median_point is not None:
-            mx, my = median_point
-            plt.scatter(mx, my, c='red', s=200, marker='*', edgecolors='black', linewidth=1, label='Corpus Median')
-
-        plt.title('Political Ideology Embedding', fontsize=15)
-        plt.xlabel('Economic Axis (Left ← → Right)', fontsize=12)
-        plt.ylabel('Social Axis (Liberal ↑ → Conservative ↓)', fontsize=12)
-        plt.xlim(-10, 10)
-        plt.ylim(-10, 10)
-        plt.grid(True, linestyle='--', linewidth=0.5)
-        plt.legend()
+        plt.imshow(get_renderer().render(np.asarray(points, dtype=np.float64), median_point))
+        plt.axis('off')
         plt.tight_layout()
         plt.show()
         
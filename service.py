@@ -0,0 +1,259 @@
+"""HTTP scoring service around Segmenter.
+
+Usage:
+    python service.py --port 8080
+
+POST /score with {"text": "..."} or {"sentences": [...]} (optional "top_k")
+returns {"sentences": [{"sentence", "econ", "social", "probs"}, ...],
+"median": [econ, social] or null}. GET /health reports readiness and
+GET /metrics serves Prometheus text.
+
+Classification runs on one dedicated model thread. Concurrent requests'
+(sentence, context) pairs are merged by a MicroBatcher into shared forward
+passes, waiting at most --max-delay-ms for a batch to fill. Once
+--max-pending pairs are queued, new requests are rejected with 503; a single
+request with more pairs than that can never fit and is rejected with 413.
+"""
+import argparse
+import asyncio
+import functools
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import tornado.web
+
+from embedding_cache import EmbeddingCache
+from registry import resources
+from segmenter import Segmenter
+from telemetry import PrometheusSink, telemetry
+
+
+class Overloaded(Exception):
+    """Raised when the micro-batcher already holds its maximum number of pending pairs."""
+
+
+class TooLarge(Exception):
+    """Raised when one request has more pairs than the micro-batcher will ever hold."""
+
+
+class MicroBatcher:
+    """Merges concurrent classification requests into shared engine calls on one executor."""
+
+    def __init__(self, engine, executor, max_batch=64, max_delay=0.01, max_pending=1024, batch_size=None):
+        self.engine = engine
+        self.executor = executor
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.pending = 0
+        self._queue = asyncio.Queue()
+
+    async def submit(self, pairs, encoded=None):
+        """Return the (len(pairs), num_labels) probabilities once the batch holding pairs has run."""
+        if not pairs:
+            return np.zeros((0, len(self.engine.id2label)), dtype=np.float32)
+        if len(pairs) > self.max_pending:
+            telemetry.count("service_too_large")
+            raise TooLarge(f"{len(pairs)} pairs exceed the limit of {self.max_pending}")
+        if self.pending + len(pairs) > self.max_pending:
+            telemetry.count("service_rejected")
+            raise Overloaded(f"{self.pending} pairs already pending")
+        self.pending += len(pairs)
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((pairs, encoded, future))
+        try:
+            return await future
+        finally:
+            self.pending -= len(pairs)
+
+    async def _next_batch(self):
+        loop = asyncio.get_running_loop()
+        items = [await self._queue.get()]
+        size = len(items[0][0])
+        deadline = loop.time() + self.max_delay
+        while size < self.max_batch:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            items.append(item)
+            size += len(item[0])
+        # Requests whose client went away are dropped before the forward pass.
+        return [(pairs, encoded, future) for pairs, encoded, future in items if not future.done()]
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = await self._next_batch()
+            if not items:
+                continue
+            pairs = [pair for request_pairs, _, _ in items for pair in request_pairs]
+            encoded = None
+            if all(request_encoded is not None for _, request_encoded, _ in items):
+                encoded = [ids for _, request_encoded, _ in items for ids in request_encoded]
+            telemetry.count("service_micro_batches")
+            try:
+                probs = await loop.run_in_executor(
+                    self.executor,
+                    functools.partial(self.engine.probabilities, pairs, batch_size=self.batch_size, encoded=encoded),
+                )
+            except Exception as exc:
+                for _, _, future in items:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+            offset = 0
+            for request_pairs, _, future in items:
+                if not future.done():
+                    future.set_result(probs[offset:offset + len(request_pairs)])
+                offset += len(request_pairs)
+
+
+class ScoringService:
+    """Segments, embeds and builds context per request, then classifies through the shared batcher."""
+
+    def __init__(self, engine, batcher, embedding_backend, embedding_cache=None, language_model="en_core_web_sm"):
+        self.engine = engine
+        self.batcher = batcher
+        self.embedding_backend = embedding_backend
+        self.embedding_cache = embedding_cache
+        self.language_model = language_model
+
+    async def score(self, text=None, sentences=None, top_k=3):
+        loop = asyncio.get_running_loop()
+
+        def segment():
+            segmenter = Segmenter(
+                text,
+                language_model=self.language_model,
+                embedding_cache=self.embedding_cache,
+                embedding_backend=self.embedding_backend,
+                engine=self.engine,
+            )
+            if sentences is not None:
+                segmenter.sentences = [sentence.strip() for sentence in sentences if sentence.strip()]
+            return segmenter
+
+        segmenter = await loop.run_in_executor(None, segment)
+        await segmenter._calculate_embeddings()
+        await loop.run_in_executor(None, segmenter._construct_similarity_context)
+
+        pairs, encoded = segmenter._classification_inputs()
+        probs = await self.batcher.submit(pairs, encoded)
+        analysis = segmenter._set_analysis(segmenter.sentences, segmenter._contexts(), probs, top_k)
+        return {
+            "sentences": [
+                {"sentence": sentence, "econ": econ_score, "social": social_score, "probs": top_probs}
+                for sentence, econ_score, social_score, top_probs in analysis
+            ],
+            "median": None if analysis.median is None else analysis.median.tolist(),
+        }
+
+
+class ScoreHandler(tornado.web.RequestHandler):
+    def initialize(self, service):
+        self.service = service
+
+    async def post(self):
+        try:
+            body = json.loads(self.request.body or b"{}")
+        except json.JSONDecodeError:
+            raise tornado.web.HTTPError(400, reason="Body must be JSON")
+        if not isinstance(body, dict):
+            raise tornado.web.HTTPError(400, reason="Body must be a JSON object")
+        text, sentences, top_k = body.get("text"), body.get("sentences"), body.get("top_k", 3)
+        if (text is None) == (sentences is None):
+            raise tornado.web.HTTPError(400, reason="Send exactly one of 'text' or 'sentences'")
+        if text is not None and not isinstance(text, str):
+            raise tornado.web.HTTPError(400, reason="'text' must be a string")
+        if sentences is not None and not (
+            isinstance(sentences, list) and all(isinstance(sentence, str) for sentence in sentences)
+        ):
+            raise tornado.web.HTTPError(400, reason="'sentences' must be a list of strings")
+        if isinstance(top_k, bool) or not isinstance(top_k, int) or top_k < 1:
+            raise tornado.web.HTTPError(400, reason="'top_k' must be a positive integer")
+
+        try:
+            with telemetry.span("request"):
+                result = await self.service.score(text=text, sentences=sentences, top_k=top_k)
+        except TooLarge as exc:
+            raise tornado.web.HTTPError(413, reason=str(exc))
+        except Overloaded:
+            self.set_header("Retry-After", "1")
+            raise tornado.web.HTTPError(503, reason="Scoring queue is full")
+        self.write(result)
+
+
+class HealthHandler(tornado.web.RequestHandler):
+    def initialize(self, service):
+        self.service = service
+
+    def get(self):
+        self.write({"status": "ok", "pending": self.service.batcher.pending})
+
+
+class MetricsHandler(tornado.web.RequestHandler):
+    def initialize(self, sink):
+        self.sink = sink
+
+    def get(self):
+        self.set_header("Content-Type", "text/plain; version=0.0.4")
+        self.write(self.sink.exposition())
+
+
+def make_app(service, metrics_sink):
+    return tornado.web.Application([
+        (r"/score", ScoreHandler, {"service": service}),
+        (r"/health", HealthHandler, {"service": service}),
+        (r"/metrics", MetricsHandler, {"sink": metrics_sink}),
+    ])
+
+
+async def serve(args):
+    metrics_sink = telemetry.add_sink(PrometheusSink())
+    resources.warm_up("cached_engine", f"spacy:{args.language_model}")
+    engine = resources.get("cached_engine")
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="polcompass-model")
+    batcher = MicroBatcher(
+        engine,
+        executor,
+        max_batch=args.max_batch,
+        max_delay=args.max_delay_ms / 1000,
+        max_pending=args.max_pending,
+        batch_size=args.batch_size,
+    )
+    embedding_backend = Segmenter._resolve_embedding_backend(args.embedding_backend, max_concurrency=args.max_concurrency)
+    embedding_cache = EmbeddingCache(dim=embedding_backend.dim, model=embedding_backend.name) if args.embedding_cache else None
+    service = ScoringService(engine, batcher, embedding_backend, embedding_cache, language_model=args.language_model)
+
+    batcher_task = asyncio.create_task(batcher.run())
+    make_app(service, metrics_sink).listen(args.port)
+    print(f"Listening on port {args.port}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        batcher_task.cancel()
+        executor.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve political compass scores over HTTP.")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-batch", type=int, default=64, help="Pairs merged into one classifier call")
+    parser.add_argument("--max-delay-ms", type=float, default=10, help="Longest wait for a batch to fill")
+    parser.add_argument("--max-pending", type=int, default=1024, help="Pending pairs before requests get 503")
+    parser.add_argument("--batch-size", type=int, default=None, help="Classifier batch size")
+    parser.add_argument("--language-model", default="en_core_web_sm")
+    parser.add_argument("--embedding-backend", choices=["openai", "local"], default="openai")
+    parser.add_argument("--embedding-cache", action="store_true", help="Reuse embeddings from the on-disk cache")
+    parser.add_argument("--max-concurrency", type=int, default=4)
+    asyncio.run(serve(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+import os
+
+
+def iter_text_chunks(source, chunk_chars=100_000):
+    """Yield text chunks from a file path or pass through an iterable of strings.
+
+    Files are read line by line and only split at blank lines, so a sentence
+    never straddles two chunks unless a single paragraph exceeds chunk_chars.
+    """
+    if not isinstance(source, (str, os.PathLike)):
+        yield from source
+        return
+
+    with open(source, encoding="utf-8") as f:
+        lines, size = [], 0
+        for line in f:
+            lines.append(line)
+            size += len(line)
+            if size >= chunk_chars and not line.strip():
+                yield "".join(lines)
+                lines, size = [], 0
+        if lines:
+            yield "".join(lines)
+
+
+def iter_sentences(nlp, chunks, batch_size=8, n_process=1):
+    """Segment chunks incrementally with nlp.pipe, yielding stripped sentences."""
+    for doc in nlp.pipe(chunks, batch_size=batch_size, n_process=n_process):
+        for sent in doc.sents:
+            sentence = sent.text.strip()
+            if sentence:
+                yield sentence
@@ -0,0 +1,187 @@
+import contextlib
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+_request_sink = contextvars.ContextVar("polcompass_request_sink", default=None)
+_NULL_SPAN = contextlib.nullcontext()
+
+
+def _labels(attrs):
+    return tuple(sorted((key, str(value)) for key, value in attrs.items()))
+
+
+class Sink:
+    """Receives finished spans and counter increments."""
+
+    def span(self, name, seconds, attrs):
+        pass
+
+    def count(self, name, value, attrs):
+        pass
+
+
+class LoggingSink(Sink):
+    def __init__(self, level=logging.INFO):
+        self.level = level
+
+    def span(self, name, seconds, attrs):
+        logger.log(self.level, "span %s %.4fs %s", name, seconds, attrs or "")
+
+    def count(self, name, value, attrs):
+        logger.log(self.level, "count %s +%s %s", name, value, attrs or "")
+
+
+class MemorySink(Sink):
+    """Keeps every span and counter in memory; used for tests and per-request breakdowns."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.spans = []
+        self.counters = defaultdict(float)
+
+    def span(self, name, seconds, attrs):
+        with self._lock:
+            self.spans.append((name, seconds, attrs))
+
+    def count(self, name, value, attrs):
+        with self._lock:
+            self.counters[name] += value
+
+    def totals(self):
+        """Total seconds per span name, in first-seen order."""
+        totals = {}
+        with self._lock:
+            for name, seconds, _ in self.spans:
+                totals[name] = totals.get(name, 0.0) + seconds
+        return totals
+
+    def reset(self):
+        with self._lock:
+            self.spans.clear()
+            self.counters.clear()
+
+
+class PrometheusSink(Sink):
+    """Aggregates spans as summaries and counts as counters in the Prometheus text format."""
+
+    def __init__(self, prefix="polcompass"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._counters = defaultdict(float)
+        self._span_counts = defaultdict(int)
+        self._span_sums = defaultdict(float)
+
+    def span(self, name, seconds, attrs):
+        key = (name, _labels(attrs))
+        with self._lock:
+            self._span_counts[key] += 1
+            self._span_sums[key] += seconds
+
+    def count(self, name, value, attrs):
+        with self._lock:
+            self._counters[(name, _labels(attrs))] += value
+
+    @staticmethod
+    def _format_labels(labels):
+        if not labels:
+            return ""
+        return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+    def exposition(self):
+        lines = []
+        with self._lock:
+            for metric in sorted({name for name, _ in self._counters}):
+                lines.append(f"# TYPE {self.prefix}_{metric}_total counter")
+                for (name, labels), value in sorted(self._counters.items()):
+                    if name == metric:
+                        lines.append(f"{self.prefix}_{metric}_total{self._format_labels(labels)} {value:g}")
+            for metric in sorted({name for name, _ in self._span_counts}):
+                lines.append(f"# TYPE {self.prefix}_{metric}_seconds summary")
+                for (name, labels), count in sorted(self._span_counts.items()):
+                    if name == metric:
+                        formatted = self._format_labels(labels)
+                        lines.append(f"{self.prefix}_{metric}_seconds_count{formatted} {count}")
+                        lines.append(f"{self.prefix}_{metric}_seconds_sum{formatted} {self._span_sums[(name, labels)]:.6f}")
+        return "\n".join(lines) + "\n"
+
+
+class _Span:
+    __slots__ = ("telemetry", "name", "attrs", "start")
+
+    def __init__(self, telemetry, name, attrs):
+        self.telemetry = telemetry
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        seconds = time.perf_counter() - self.start
+        for sink in self.telemetry._sinks_now():
+            sink.span(self.name, seconds, self.attrs)
+        return False
+
+
+class Telemetry:
+    """Timing spans and counters fanned out to the registered sinks.
+
+    With no sink registered and no request collector active, ``span`` hands
+    back a shared no-op context manager and ``count`` returns immediately.
+    """
+
+    def __init__(self):
+        self.sinks = []
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+        return sink
+
+    def remove_sink(self, sink):
+        self.sinks.remove(sink)
+
+    def _sinks_now(self):
+        request_sink = _request_sink.get()
+        return self.sinks if request_sink is None else self.sinks + [request_sink]
+
+    @property
+    def enabled(self):
+        return bool(self.sinks) or _request_sink.get() is not None
+
+    def span(self, name, **attrs):
+        if not self.sinks and _request_sink.get() is None:
+            return _NULL_SPAN
+        return _Span(self, name, attrs)
+
+    def count(self, name, value=1, **attrs):
+        if not self.sinks and _request_sink.get() is None:
+            return
+        for sink in self._sinks_now():
+            sink.count(name, value, attrs)
+
+    @contextlib.contextmanager
+    def collect(self):
+        """Record the spans and counts of the enclosed work (and tasks it starts) into a new MemorySink."""
+        sink = MemorySink()
+        token = _request_sink.set(sink)
+        try:
+            yield sink
+        finally:
+            _request_sink.reset(token)
+
+
+def _configure_from_env(telemetry):
+    # POLCOMPASS_TELEMETRY=log turns on the logging sink for the whole process.
+    if os.environ.get("POLCOMPASS_TELEMETRY", "").lower() == "log":
+        telemetry.add_sink(LoggingSink())
+
+
+telemetry = Telemetry()
+_configure_from_env(telemetry)
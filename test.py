@@ -1,8 +1,6 @@
 import torch
-from transformers import AutoModelForSequenceClassification, AutoTokenizer
-
-model = AutoModelForSequenceClassification.from_pretrained("manifesto-project/manifestoberta-xlm-roberta-56policy-topics-context-2024-1-1", trust_remote_code=True)
-tokenizer = AutoTokenizer.from_pretrained("xlm-roberta-large")
+from constants import category_ideology_mapping
+from registry import resources
 
 political_sentences_m = [
     "On this very day, 9th December, the first meeting of the Constituent Assembly was held. As the nation celebrates 75 years of the Constitution, this date serves as a reminder to uphold the principles of equality and inclusive development.",
@@ -43,45 +41,6 @@ political_sentences = [
     "Vote Trump, and you will see a mass exodus of manufacturing from China to Pennsylvania, from South Korea to North Carolina, and from Germany to Georgia.",
     "We will bring back the American dream, bigger, better, and stronger than ever before."
 ]
-context = ""
-political_count = len(political_sentences)
-
-# Initialize a dictionary to accumulate scores for each category
-category_scores = {}
-
-for sentence in political_sentences:
-    print("\nProcessing political sentence:")
-    inputs = tokenizer(sentence, context, return_tensors="pt", max_length=300, padding="max_length", truncation=True)
-    logits = model(**inputs).logits
-    probabilities = torch.softmax(logits, dim=1).tolist()[0]
-
-    # Convert to {label_name: prob%}
-    class_probs = {model.config.id2label[i]: probabilities[i]*100 for i in range(len(probabilities))}
-    # Sort by probability descending
-    class_probs = dict(sorted(class_probs.items(), key=lambda item: item[1], reverse=True))
-
-    # Print top 5 predicted classes
-    top_5 = list(class_probs.items())[:5]
-    for predicted_class, probability in top_5:
-        print(f"Class: {predicted_class} with probability {probability:.2f}%")
-
-    # Update category scores
-    for predicted_class, probability in top_5:
-        # Accumulate the probability for each category
-        if predicted_class not in category_scores:
-            category_scores[predicted_class] = 0.0
-        category_scores[predicted_class] += probability
-
-# After processing all sentences, we have cumulative category scores.
-print("\nCumulative Category Scores:")
-for category, score in category_scores.items():
-    print(f"{category}: {score:.2f}%")
-
-# Sort categories by cumulative score to see which categories dominate.
-sorted_scores = sorted(category_scores.items(), key=lambda x: x[1], reverse=True)
-print("\nTop categories by cumulative score:")
-for category, score in sorted_scores[:10]:
-    print(f"{category}: {score:.2f}%")
 
 
 
@@ -102,43 +61,93 @@ def calculate_econ_soc_from_probs(class_probs, category_map):
             soc_total += soc_score * (prob / 100.0)
     return econ_total, soc_total
 
-sentence_econ_scores = []
-sentence_soc_scores = []
-
-for sentence in political_sentences:
-    print("\nProcessing political sentence:")
-    inputs = tokenizer(sentence, context, return_tensors="pt", max_length=300, padding="max_length", truncation=True)
-    logits = model(**inputs).logits
-    probabilities = torch.softmax(logits, dim=1).tolist()[0]
-
-    # Convert to {label_name: prob%}
-    class_probs = {model.config.id2label[i]: probabilities[i]*100 for i in range(len(probabilities))}
-    # Sort by probability descending
-    class_probs = dict(sorted(class_probs.items(), key=lambda item: item[1], reverse=True))
-
-    # Print top 5 predicted classes
-    top_5 = list(class_probs.items())[:5]
-    for predicted_class, probability in top_5:
-        print(f"Class: {predicted_class} with probability {probability:.2f}%")
-
-    # Compute econ and social scores for this sentence
-    # First, we sum the top 5 probabilities to normalize
-    top_5_total_prob = sum(prob for _, prob in top_5)
-    # Normalize probabilities so each sentence is on a comparable scale
-    normalized_top_5 = {cat: (prob / top_5_total_prob) * 100 for cat, prob in top_5}
-
-    # Calculate sentence-level econ and social scores
-    econ_score_sentence, soc_score_sentence = calculate_econ_soc_from_probs(normalized_top_5, category_ideology_mapping)
-    sentence_econ_scores.append(econ_score_sentence)
-    sentence_soc_scores.append(soc_score_sentence)
-
-if sentence_econ_scores and sentence_soc_scores:
-    final_econ = sum(sentence_econ_scores) / len(sentence_econ_scores)
-    final_soc = sum(sentence_soc_scores) / len(sentence_soc_scores)
-else:
-    final_econ = 0.0
-    final_soc = 0.0
-
-print("\nFinal Normalized Political Compass Scores:")
-print(f"Economic axis score: {final_econ:.2f} (negative=left, positive=right)")
-print(f"Social axis score: {final_soc:.2f} (negative=authoritarian, positive=libertarian)")
\ No newline at end of file
+
+
+def main():
+    model = resources.get("classifier")
+    tokenizer = resources.get("tokenizer")
+
+    context = ""
+    political_count = len(political_sentences)
+
+    # Initialize a dictionary to accumulate scores for each category
+    category_scores = {}
+
+    for sentence in political_sentences:
+        print("\nProcessing political sentence:")
+        inputs = tokenizer(sentence, context, return_tensors="pt", max_length=300, padding="max_length", truncation=True)
+        logits = model(**inputs).logits
+        probabilities = torch.softmax(logits, dim=1).tolist()[0]
+
+        # Convert to {label_name: prob%}
+        class_probs = {model.config.id2label[i]: probabilities[i]*100 for i in range(len(probabilities))}
+        # Sort by probability descending
+        class_probs = dict(sorted(class_probs.items(), key=lambda item: item[1], reverse=True))
+
+        # Print top 5 predicted classes
+        top_5 = list(class_probs.items())[:5]
+        for predicted_class, probability in top_5:
+            print(f"Class: {predicted_class} with probability {probability:.2f}%")
+
+        # Update category scores
+        for predicted_class, probability in top_5:
+            # Accumulate the probability for each category
+            if predicted_class not in category_scores:
+                category_scores[predicted_class] = 0.0
+            category_scores[predicted_class] += probability
+
+    # After processing all sentences, we have cumulative category scores.
+    print("\nCumulative Category Scores:")
+    for category, score in category_scores.items():
+        print(f"{category}: {score:.2f}%")
+
+    # Sort categories by cumulative score to see which categories dominate.
+    sorted_scores = sorted(category_scores.items(), key=lambda x: x[1], reverse=True)
+    print("\nTop categories by cumulative score:")
+    for category, score in sorted_scores[:10]:
+        print(f"{category}: {score:.2f}%")
+
+    sentence_econ_scores = []
+    sentence_soc_scores = []
+
+    for sentence in political_sentences:
+        print("\nProcessing political sentence:")
+        inputs = tokenizer(sentence, context, return_tensors="pt", max_length=300, padding="max_length", truncation=True)
+        logits = model(**inputs).logits
+        probabilities = torch.softmax(logits, dim=1).tolist()[0]
+
+        # Convert to {label_name: prob%}
+        class_probs = {model.config.id2label[i]: probabilities[i]*100 for i in range(len(probabilities))}
+        # Sort by probability descending
+        class_probs = dict(sorted(class_probs.items(), key=lambda item: item[1], reverse=True))
+
+        # Print top 5 predicted classes
+        top_5 = list(class_probs.items())[:5]
+        for predicted_class, probability in top_5:
+            print(f"Class: {predicted_class} with probability {probability:.2f}%")
+
+        # Compute econ and social scores for this sentence
+        # First, we sum the top 5 probabilities to normalize
+        top_5_total_prob = sum(prob for _, prob in top_5)
+        # Normalize probabilities so each sentence is on a comparable scale
+        normalized_top_5 = {cat: (prob / top_5_total_prob) * 100 for cat, prob in top_5}
+
+        # Calculate sentence-level econ and social scores
+        econ_score_sentence, soc_score_sentence = calculate_econ_soc_from_probs(normalized_top_5, category_ideology_mapping)
+        sentence_econ_scores.append(econ_score_sentence)
+        sentence_soc_scores.append(soc_score_sentence)
+
+    if sentence_econ_scores and sentence_soc_scores:
+        final_econ = sum(sentence_econ_scores) / len(sentence_econ_scores)
+        final_soc = sum(sentence_soc_scores) / len(sentence_soc_scores)
+    else:
+        final_econ = 0.0
+        final_soc = 0.0
+
+    print("\nFinal Normalized Political Compass Scores:")
+    print(f"Economic axis score: {final_econ:.2f} (negative=left, positive=right)")
+    print(f"Social axis score: {final_soc:.2f} (negative=authoritarian, positive=libertarian)")
+
+
+if __name__ == "__main__":
+    main()